@@ -0,0 +1,135 @@
+import math
+import time
+import asyncio
+from collections import deque
+
+import config
+
+# Jalur prioritas, diurutkan dari prioritas tertinggi.
+# 'realtime' untuk sesi BCI online, 'bulk' untuk scoring massal.
+LANES = ('realtime', 'bulk')
+
+class AdmissionRejected(Exception):
+    """Request ditolak oleh admission control sebelum inferensi."""
+
+class QueueFull(AdmissionRejected):
+    """Antrian jalur ini penuh; klien sebaiknya mencoba lagi nanti."""
+
+class DeadlineExceeded(AdmissionRejected):
+    """Deadline request sudah lewat sebelum inferensi dimulai."""
+
+def deadline_from_header(lane, deadline_ms=None):
+    """
+    Mengubah budget waktu relatif (ms, dari header) menjadi deadline
+    absolut berbasis time.monotonic(). Jika header tidak ada, dipakai
+    default per jalur dari config.ADMISSION_DEFAULT_DEADLINE_MS.
+    Raise ValueError jika deadline_ms bukan angka positif berhingga.
+    """
+    if deadline_ms is None:
+        deadline_ms = config.ADMISSION_DEFAULT_DEADLINE_MS[lane]
+    if not math.isfinite(deadline_ms) or deadline_ms <= 0:
+        raise ValueError(f"Deadline harus angka positif berhingga (ms), diterima {deadline_ms}")
+    return time.monotonic() + deadline_ms / 1000
+
+class AdmissionController:
+    """
+    Membatasi jumlah inferensi yang berjalan bersamaan (in-flight),
+    dengan antrian terbatas per jalur prioritas dan deadline per request.
+
+    - Jika slot tersedia, request langsung diizinkan.
+    - Jika tidak, request masuk antrian jalurnya; antrian penuh -> QueueFull.
+    - Slot yang kosong selalu diberikan ke jalur 'realtime' lebih dulu.
+    - Request yang deadline-nya lewat selama menunggu dibuang sebelum
+      inferensi -> DeadlineExceeded.
+
+    Semua method dipanggil dari event loop (tidak perlu lock).
+    """
+
+    def __init__(self, max_concurrency=config.ADMISSION_MAX_CONCURRENCY,
+                 max_queue=config.ADMISSION_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = dict(max_queue)
+        self.in_flight = 0
+        self._waiters = {lane: deque() for lane in LANES}
+        self.counts = {lane: {'served': 0, 'rejected': 0, 'expired': 0, 'failed': 0}
+                       for lane in LANES}
+
+    async def acquire(self, lane, deadline):
+        """
+        Menunggu sampai mendapat slot inferensi atau deadline lewat.
+        Pemanggil WAJIB memanggil release() setelah selesai.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Jalur '{lane}' tidak dikenali. Gunakan salah satu dari {LANES}.")
+
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            self.counts[lane]['expired'] += 1
+            raise DeadlineExceeded("Deadline sudah lewat saat request diterima.")
+
+        # Jalur cepat: ada slot kosong dan tidak ada yang mengantri
+        if self.in_flight < self.max_concurrency and not any(self._waiters.values()):
+            self.in_flight += 1
+            return
+
+        if len(self._waiters[lane]) >= self.max_queue[lane]:
+            self.counts[lane]['rejected'] += 1
+            raise QueueFull(f"Antrian '{lane}' penuh ({self.max_queue[lane]} request).")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Slot diberikan tepat saat timeout/cancel: kembalikan
+                self.release()
+            else:
+                try:
+                    self._waiters[lane].remove(future)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.counts[lane]['expired'] += 1
+            raise DeadlineExceeded("Deadline lewat saat menunggu di antrian.")
+
+        # Slot didapat, tapi pastikan deadline belum lewat sebelum inferensi
+        if time.monotonic() >= deadline:
+            self.release()
+            self.counts[lane]['expired'] += 1
+            raise DeadlineExceeded("Deadline lewat saat menunggu di antrian.")
+
+    def release(self):
+        """Mengembalikan slot dan memberikannya ke request berikutnya."""
+        self.in_flight -= 1
+        while self.in_flight < self.max_concurrency:
+            future = self._next_waiter()
+            if future is None:
+                return
+            if future.done():
+                # Sudah dibatalkan (timeout) - lewati
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _next_waiter(self):
+        for lane in LANES:
+            if self._waiters[lane]:
+                return self._waiters[lane].popleft()
+        return None
+
+    def record_served(self, lane):
+        self.counts[lane]['served'] += 1
+
+    def record_failed(self, lane):
+        """Request sudah diizinkan tetapi gagal (cth: 400/404/500)."""
+        self.counts[lane]['failed'] += 1
+
+    def metrics(self):
+        return {
+            'in_flight': self.in_flight,
+            'max_concurrency': self.max_concurrency,
+            'queued': {lane: len(waiters) for lane, waiters in self._waiters.items()},
+            'counts': {lane: dict(counts) for lane, counts in self.counts.items()},
+        }
@@ -1,25 +1,30 @@
 import os
+import re
+import hmac
+import time
+import shutil
 import numpy as np
 import tensorflow as tf
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, conlist, validator
-from typing import List
+from typing import List, Optional
 import uvicorn
 
 # Impor config kita dari Sesi 1
-# Kita perlu tahu di mana model disimpan dan bentuk datanya
-try:
-    import config
-except ImportError:
-    print("PERINGATAN: Tidak dapat mengimpor config.py. Menggunakan nilai default.")
-    # Sediakan fallback jika config.py tidak ditemukan (berguna untuk testing cepat)
-    class ConfigFallback:
-        MODEL_OUTPUT_DIR = "../../models"
-        MODEL_FILENAME = "eegnet_model.h5"
-        CHANS = 22
-        SAMPLES = 1000
-        EVENT_ID = {'769': 0, '770': 1, '771': 2, '772': 3} # Default
-    config = ConfigFallback()
+# Kita perlu tahu di mana model disimpan dan bentuk datanya.
+# Semua modul di 'src/' (tta, calibration, dll.) juga mengimpor config,
+# jadi server harus dijalankan dari dalam folder 'src/'.
+import config
+
+from tta import predict_tta, AGGREGATIONS
+from data_processing import decimate
+from calibration import calibrate, build_feature_extractor, CALIBRATION_METHODS
+from profiling import capture_profile, StageTimer, SlowRequestLog
+from admission import (AdmissionController, QueueFull, DeadlineExceeded,
+                       deadline_from_header, LANES)
 
 
 # --- 1. Definisi "Data Contract" (Pydantic) ---
@@ -28,8 +33,23 @@ except ImportError:
 class RawEpochData(BaseModel):
     # Kita harapkan data berbentuk List[List[float]]
     # yang bisa dikonversi ke numpy array (CHANS, SAMPLES) -> (22, 1000)
+    # atau epoch penuh (CHANS, EPOCH_SAMPLES) -> (22, 1251) untuk TTA
     data: List[List[float]]
     
+    # Parameter test-time augmentation (opsional, per request)
+    # n_crops: jumlah crop bergeser (K) dari epoch penuh
+    # aggregation: 'mean' atau 'geomean'
+    n_crops: Optional[int] = None
+    aggregation: Optional[str] = None
+    
+    # Jika diisi, gunakan model hasil kalibrasi user ini (lihat /calibrate)
+    user_id: Optional[str] = None
+    
+    # Frekuensi sampling data yang dikirim (default: config.SAMPLING_RATE).
+    # Data 250 Hz didesimasi di server sesuai config.DECIMATION_FACTOR;
+    # data yang sudah didesimasi dikirim dengan EFFECTIVE_SAMPLING_RATE.
+    sampling_rate: Optional[float] = None
+    
     # Validasi tambahan Pydantic (opsional tapi bagus)
     # @validator('data')
     # def check_channels_count(cls, v):
@@ -43,6 +63,30 @@ class PredictionResponse(BaseModel):
     predicted_index: int
     confidence: float
     raw_probabilities: List[float]
+    n_crops: int
+    inference_ms: float
+    user_id: Optional[str] = None
+
+# Data kalibrasi untuk satu user: beberapa epoch berlabel
+class CalibrationRequest(BaseModel):
+    user_id: str
+    # Bentuk: (n_epochs, CHANS, SAMPLES) dalam Volt, sama seperti /predict
+    epochs: List[List[List[float]]]
+    # Label integer 0..NB_CLASSES-1 untuk setiap epoch
+    labels: List[int]
+    # 'logistic' atau 'dense' (default: config.CALIBRATION_METHOD)
+    method: Optional[str] = None
+    # Frekuensi sampling epochs (lihat RawEpochData.sampling_rate)
+    sampling_rate: Optional[float] = None
+
+class CalibrationResponse(BaseModel):
+    user_id: str
+    method: str
+    n_epochs: int
+    feature_ms: float
+    calibration_ms: float
+    train_accuracy: float
+    validation_accuracy: Optional[float] = None
 
 # --- 2. Inisialisasi Aplikasi FastAPI ---
 
@@ -56,6 +100,60 @@ app = FastAPI(
 model = None
 # Mapping dari index ke nama kelas (cth: 0 -> '769')
 CLASS_LABELS = {}
+# Varian model per-user hasil kalibrasi: {user_id: model}
+USER_MODELS = {}
+# Sub-model sampai layer 'flatten', dibuat sekali dari model dasar
+feature_extractor = None
+
+# Buffer timing request terakhir (untuk diagnosa lonjakan latensi)
+SLOW_REQUESTS = SlowRequestLog()
+# Batas inferensi bersamaan, antrian per jalur prioritas dan deadline
+ADMISSION = AdmissionController()
+
+def to_model_rate(X, sampling_rate=None):
+    """
+    Menyamakan frekuensi sampling input dengan yang dilihat model
+    (config.EFFECTIVE_SAMPLING_RATE).
+
+    Untuk epoch penuh (EPOCH_SAMPLES_RAW sampel) langkahnya sama persis
+    dengan load_and_preprocess_data: desimasi dulu, lalu dipotong ke
+    SAMPLES saat inferensi. Jika klien sudah memotong ke SAMPLES_RAW dan
+    DECIMATION_FACTOR > 1, filter anti-aliasing melihat ujung potongan
+    sebagai tepi sinyal, sehingga beberapa sampel terakhir sedikit berbeda
+    dari training; kirim epoch penuh agar hasilnya identik (lihat client.py).
+    """
+    if sampling_rate is None or sampling_rate == config.SAMPLING_RATE:
+        truncated = X.shape[-1] == config.SAMPLES_RAW
+        X = decimate(X, config.DECIMATION_FACTOR)
+        # Data yang sudah dipotong klien ke SAMPLES_RAW -> tepat SAMPLES
+        return X[..., :config.SAMPLES] if truncated else X
+    if sampling_rate == config.EFFECTIVE_SAMPLING_RATE:
+        return X
+    raise ValueError(f"sampling_rate harus {config.SAMPLING_RATE} atau "
+                     f"{config.EFFECTIVE_SAMPLING_RATE}, diterima {sampling_rate}")
+
+# user_id dipakai sebagai nama file, jadi batasi karakternya (dicek dengan fullmatch,
+# karena '$' pada .match juga menerima newline di akhir string)
+USER_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+def get_user_model(user_id):
+    """
+    Mengambil model per-user dari memori, atau memuatnya dari
+    config.USER_MODEL_DIR jika server baru di-restart.
+    Return: model, atau None jika user belum pernah dikalibrasi.
+    """
+    if not USER_ID_PATTERN.fullmatch(user_id):
+        raise ValueError(f"user_id tidak valid: '{user_id}'")
+    if user_id not in USER_MODELS:
+        user_model_path = os.path.join(config.USER_MODEL_DIR, f'{user_id}.h5')
+        if not os.path.exists(user_model_path):
+            return None
+        user_model = tf.keras.models.load_model(user_model_path)
+        if user_model.input_shape[2] != config.SAMPLES:
+            raise ValueError(f"Model user '{user_id}' dibuat untuk {user_model.input_shape[2]} sampel, "
+                             f"bukan {config.SAMPLES}. Lakukan kalibrasi ulang.")
+        USER_MODELS[user_id] = user_model
+    return USER_MODELS[user_id]
 
 # --- 3. Logika Startup (Memuat Model) ---
 
@@ -65,7 +163,7 @@ def load_model_on_startup():
     Memuat model Keras .h5 saat server pertama kali dinyalakan.
     Ini memastikan model ada di memori dan siap untuk prediksi cepat.
     """
-    global model, CLASS_LABELS
+    global model, CLASS_LABELS, feature_extractor
     
     model_path = os.path.join(config.MODEL_OUTPUT_DIR, config.MODEL_FILENAME)
     
@@ -75,8 +173,15 @@ def load_model_on_startup():
     else:
         print(f"Memuat model dari: {model_path}...")
         try:
-            model = tf.keras.models.load_model(model_path)
-            model.summary() # Tampilkan summary di log server
+            loaded = tf.keras.models.load_model(model_path)
+            loaded.summary() # Tampilkan summary di log server
+            # Model dari DECIMATION_FACTOR lain membuat semua request gagal
+            if loaded.input_shape[2] != config.SAMPLES:
+                raise ValueError(f"Model mengharapkan {loaded.input_shape[2]} sampel, sedangkan "
+                                 f"config.SAMPLES = {config.SAMPLES} (DECIMATION_FACTOR = "
+                                 f"{config.DECIMATION_FACTOR}). Latih ulang model atau sesuaikan config.")
+            model = loaded
+            feature_extractor = build_feature_extractor(model)
             print("--- Model berhasil dimuat. ---")
             
             # Buat mapping terbalik untuk label
@@ -99,46 +204,135 @@ def health_check():
 # --- 5. Endpoint Prediksi Utama ---
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict_eeg(request: RawEpochData):
+async def predict_eeg(request: RawEpochData,
+                      x_priority: Optional[str] = Header(default=None),
+                      x_deadline_ms: Optional[float] = Header(default=None)):
     """
     Menerima satu epoch data EEG (22, 1000) dan mengembalikan prediksi.
-    """
-    global model, CLASS_LABELS
     
+    Jika klien mengirim epoch penuh (22, 1251) dan n_crops > 1, K crop
+    bergeser diprediksi dalam satu forward pass berbatch (TTA) lalu
+    probabilitasnya digabungkan.
+    
+    Admission control:
+    - Header X-Priority: 'realtime' (default) atau 'bulk'
+    - Header X-Deadline-Ms: budget waktu (ms); request yang masih
+      mengantri setelah deadline dibuang sebelum inferensi (503)
+    - Antrian penuh -> 429
+    """
     if model is None:
         raise HTTPException(status_code=503, detail="Model is not loaded or failed to load on startup.")
+    
+    lane = x_priority or 'realtime'
+    if lane not in LANES:
+        raise HTTPException(status_code=400, detail=f"X-Priority harus salah satu dari {LANES}")
+    if x_deadline_ms is not None and (not np.isfinite(x_deadline_ms) or x_deadline_ms <= 0):
+        raise HTTPException(status_code=400, detail="X-Deadline-Ms harus angka positif berhingga.")
+    deadline = deadline_from_header(lane, x_deadline_ms)
+    
+    timer = StageTimer()
+    # Hasil akhir request untuk /admin/slow_requests:
+    # 'served', 'rejected' (429), 'expired' (503) atau 'error'
+    outcome = 'error'
+    n_crops = request.n_crops
+    try:
+        try:
+            with timer.stage('queue'):
+                await ADMISSION.acquire(lane, deadline)
+        except QueueFull as e:
+            outcome = 'rejected'
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+        except DeadlineExceeded as e:
+            outcome = 'expired'
+            raise HTTPException(status_code=503, detail=str(e))
         
+        try:
+            # Inferensi dijalankan di threadpool agar event loop tetap bebas
+            response = await run_in_threadpool(run_prediction, request, timer)
+            ADMISSION.record_served(lane)
+            outcome = 'served'
+            n_crops = response.n_crops
+            return response
+        except Exception:
+            ADMISSION.record_failed(lane)
+            raise
+        finally:
+            ADMISSION.release()
+    finally:
+        # Selalu dicatat (termasuk antrian penuh, deadline lewat dan error),
+        # karena justru request ini yang menjelaskan lonjakan latensi
+        SLOW_REQUESTS.record(timer.total_ms(), timer.stages, outcome=outcome, lane=lane,
+                             n_samples=len(request.data[0]) if request.data else 0,
+                             n_crops=n_crops, user_id=request.user_id)
+
+def run_prediction(request, timer):
+    """
+    Preprocessing, inferensi dan post-processing untuk satu epoch.
+    Dipanggil dari predict_eeg setelah request lolos admission control.
+    """
     try:
         # 1. Konversi data Pydantic ke Numpy Array
         # Bentuk input: (22, 1000)
-        X = np.array(request.data)
+        with timer.stage('to_numpy'):
+            X = np.array(request.data)
         
         # 2. Preprocessing (HARUS SAMA PERSIS dengan saat training)
         # a. Konversi V ke uV
-        X = X * 1e6
+        # b. Desimasi ke frekuensi sampling model
+        with timer.stage('preprocess'):
+            X = X * 1e6
+            X = to_model_rate(X, request.sampling_rate)
+        
+        # 3. Validasi bentuk data
+        # Harus (22, T) dengan T = SAMPLES (tanpa TTA) atau
+        # T = EPOCH_SAMPLES (epoch penuh, crop dibuat di server)
+        if X.ndim != 2 or X.shape[0] != config.CHANS:
+            raise ValueError(f"Data harus berbentuk ({config.CHANS}, n_samples), diterima {X.shape}")
+        if X.shape[1] not in (config.SAMPLES, config.EPOCH_SAMPLES):
+            raise ValueError(f"Jumlah sampel pada {config.EFFECTIVE_SAMPLING_RATE} Hz harus "
+                             f"{config.SAMPLES} (epoch terpotong) atau {config.EPOCH_SAMPLES} "
+                             f"(epoch penuh), diterima {X.shape[1]}")
         
-        # 3. Reshape data untuk model
-        # Model Keras mengharapkan 'batch'
-        # Bentuk harus: (batch_size, n_channels, n_samples, 1)
-        # -> (1, 22, 1000, 1)
-        X_batch = X.reshape(1, config.CHANS, config.SAMPLES, 1)
+        n_crops = request.n_crops or config.TTA_N_CROPS
+        aggregation = request.aggregation or config.TTA_AGGREGATION
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"aggregation harus salah satu dari {AGGREGATIONS}")
+        if X.shape[1] == config.SAMPLES:
+            # Data sudah dipotong oleh klien, hanya ada satu crop
+            n_crops = 1
+        
+        # Pilih model: model dasar, atau varian per-user jika ada
+        active_model = model
+        if request.user_id:
+            active_model = get_user_model(request.user_id)
+            if active_model is None:
+                raise HTTPException(status_code=404, detail=f"User '{request.user_id}' belum dikalibrasi.")
 
         # 4. Jalankan prediksi
-        # 'probs' akan berbentuk [[0.1, 0.7, 0.1, 0.1]]
-        probs = model.predict(X_batch)[0] # Ambil hasil pertama dari batch
+        # Semua crop (1 atau K) masuk dalam satu batch (K, 22, 1000, 1)
+        # 'probs' akan berbentuk [0.1, 0.7, 0.1, 0.1]
+        with timer.stage('inference'):
+            probs = predict_tta(active_model, X, n_crops=n_crops, aggregation=aggregation)[0]
+        inference_ms = timer.stages['inference']
         
         # 5. Post-processing (Interpretasi hasil)
-        predicted_index = int(np.argmax(probs))
-        confidence = float(probs[predicted_index])
-        predicted_label = CLASS_LABELS.get(predicted_index, "Unknown") # 'Unknown' jika index tidak ada
+        with timer.stage('postprocess'):
+            predicted_index = int(np.argmax(probs))
+            confidence = float(probs[predicted_index])
+            predicted_label = CLASS_LABELS.get(predicted_index, "Unknown") # 'Unknown' jika index tidak ada
 
         return PredictionResponse(
             predicted_label=predicted_label,
             predicted_index=predicted_index,
             confidence=confidence,
-            raw_probabilities=probs.tolist() # Konversi numpy array ke list JSON
+            raw_probabilities=probs.tolist(), # Konversi numpy array ke list JSON
+            n_crops=n_crops,
+            inference_ms=inference_ms,
+            user_id=request.user_id
         )
         
+    except HTTPException:
+        raise
     except ValueError as ve:
         # Ini terjadi jika Pydantic check gagal atau numpy reshape gagal
         raise HTTPException(status_code=400, detail=f"Invalid data format: {ve}")
@@ -147,6 +341,141 @@ def predict_eeg(request: RawEpochData):
         print(f"ERROR: Terjadi kesalahan saat prediksi: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
+# --- 6. Endpoint Kalibrasi Per-User ---
+
+@app.post("/calibrate", response_model=CalibrationResponse)
+async def calibrate_user(request: CalibrationRequest):
+    """
+    Kalibrasi cepat untuk user baru: epoch berlabel dilewatkan sekali
+    melalui blok EEGNet yang frozen (sampai 'flatten'), lalu hanya
+    classifier head yang dilatih. Model hasilnya disimpan dan bisa
+    dipakai di /predict dengan mengisi 'user_id'.
+    
+    Forward pass kalibrasi memakai model yang sama dengan /predict, jadi
+    request ini melewati admission control di jalur 'bulk' (slot kosong
+    selalu diberikan ke 'realtime' lebih dulu).
+    """
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded or failed to load on startup.")
+    
+    lane = 'bulk'
+    try:
+        await ADMISSION.acquire(lane, deadline_from_header(lane))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    try:
+        response = await run_in_threadpool(run_calibration, request)
+        ADMISSION.record_served(lane)
+        return response
+    except Exception:
+        ADMISSION.record_failed(lane)
+        raise
+    finally:
+        ADMISSION.release()
+
+def run_calibration(request):
+    """
+    Preprocessing, kalibrasi head dan penyimpanan model per-user.
+    Dipanggil dari calibrate_user setelah request lolos admission control.
+    """
+    try:
+        if not USER_ID_PATTERN.fullmatch(request.user_id):
+            raise ValueError(f"user_id tidak valid: '{request.user_id}'")
+        method = request.method or config.CALIBRATION_METHOD
+        if method not in CALIBRATION_METHODS:
+            raise ValueError(f"method harus salah satu dari {CALIBRATION_METHODS}")
+        
+        # Preprocessing sama dengan /predict: V -> uV, desimasi, ambil SAMPLES pertama
+        X = np.array(request.epochs) * 1e6
+        if X.ndim == 3:
+            X = to_model_rate(X, request.sampling_rate)
+        if X.ndim != 3 or X.shape[1] != config.CHANS or X.shape[2] < config.SAMPLES:
+            raise ValueError(f"epochs harus berbentuk (n_epochs, {config.CHANS}, >= {config.SAMPLES}), diterima {X.shape}")
+        X = X[:, :, :config.SAMPLES, np.newaxis]
+        
+        y = np.array(request.labels)
+        if len(y) != len(X):
+            raise ValueError(f"Jumlah label ({len(y)}) tidak sama dengan jumlah epoch ({len(X)})")
+        if y.min() < 0 or y.max() >= len(CLASS_LABELS):
+            raise ValueError(f"Label harus di antara 0 dan {len(CLASS_LABELS) - 1}")
+        
+        user_model, report = calibrate(model, X, y, method=method,
+                                       feature_extractor=feature_extractor)
+        
+        os.makedirs(config.USER_MODEL_DIR, exist_ok=True)
+        user_model.save(os.path.join(config.USER_MODEL_DIR, f'{request.user_id}.h5'))
+        USER_MODELS[request.user_id] = user_model
+        
+        print(f"Kalibrasi user '{request.user_id}' selesai dalam {report['calibration_ms']:.0f} ms")
+        return CalibrationResponse(user_id=request.user_id, **report)
+        
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=f"Invalid calibration data: {ve}")
+    except Exception as e:
+        print(f"ERROR: Terjadi kesalahan saat kalibrasi: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+# --- 7. Endpoint Admin (Profiling) ---
+
+def require_admin(token):
+    """
+    Memastikan request membawa token admin yang benar (header X-Admin-Token).
+    Endpoint admin nonaktif jika EEG_ADMIN_TOKEN tidak diset.
+    """
+    expected = os.getenv(config.ADMIN_TOKEN_ENV)
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled.")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+@app.post("/admin/profile")
+def profile_server(duration: float = 10.0, tf_trace: bool = True,
+                   x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Merekam profil CPU (sampling) dan trace op TensorFlow selama `duration`
+    detik (maks config.PROFILE_MAX_DURATION_S), lalu mengembalikan file .zip
+    berisi 'cpu.folded' (format flamegraph) dan 'tf_trace/' (TensorBoard).
+    """
+    require_admin(x_admin_token)
+    if not np.isfinite(duration):
+        raise HTTPException(status_code=400, detail="duration harus berupa angka berhingga.")
+    
+    try:
+        zip_path = capture_profile(duration, tf_trace=tf_trace)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    # Hapus file sementara setelah selesai dikirim
+    cleanup = BackgroundTask(shutil.rmtree, os.path.dirname(zip_path), ignore_errors=True)
+    return FileResponse(zip_path, media_type="application/zip",
+                        filename=f"profile_{int(time.time())}.zip", background=cleanup)
+
+@app.get("/admin/slow_requests")
+def slow_requests(limit: int = config.SLOW_REQUEST_TOP_K,
+                  x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Mengembalikan request /predict paling lambat dari buffer terakhir,
+    lengkap dengan timing per-stage (ms) dan hasilnya ('outcome':
+    served, rejected, expired atau error).
+    """
+    require_admin(x_admin_token)
+    return {"slowest": SLOW_REQUESTS.slowest(limit)}
+
+# --- 8. Endpoint Metrics (Admission Control) ---
+
+@app.get("/metrics")
+def admission_metrics():
+    """
+    Jumlah request yang dilayani (served), ditolak karena antrian penuh
+    (rejected), dibuang karena deadline lewat (expired) dan gagal setelah
+    diizinkan (failed, cth: 400/404/500), per jalur. Mencakup /predict
+    dan /calibrate (jalur 'bulk').
+    """
+    return ADMISSION.metrics()
+
 # Bagian ini memungkinkan kita menjalankan file ini dengan `python src/api.py`
 if __name__ == "__main__":
     print("Menjalankan server API (untuk debugging)...")
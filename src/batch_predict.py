@@ -0,0 +1,242 @@
+import os
+import glob
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import tensorflow as tf
+
+import config
+from data_processing import load_and_preprocess_file
+from tta import predict_tta, AGGREGATIONS
+
+# Penanda akhir stream pada queue producer -> consumer
+_END_OF_STREAM = None
+
+def find_gdf_files(inputs):
+    """
+    Mengumpulkan semua file .gdf dari daftar input.
+    Input boleh berupa path file atau direktori (semua *.gdf di dalamnya).
+    Return: daftar path absolut tanpa duplikat.
+    """
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.gdf'))))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"Peringatan: {path} tidak ditemukan, dilewati.")
+    # File yang sama bisa tercantum dua kali (cth: direktori + file di dalamnya)
+    return list(dict.fromkeys(os.path.abspath(path) for path in files))
+
+def relative_names(files):
+    """
+    Nama unik untuk setiap file: path relatif terhadap direktori induk
+    bersama semua input (cth: 'sesi1/A01E.gdf' dan 'sesi2/A01E.gdf'),
+    sehingga file bernama sama dari direktori berbeda tidak tertukar.
+    """
+    if not files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    return {path: os.path.relpath(os.path.abspath(path), root) for path in files}
+
+def _produce(files, keep_full_window, n_workers, out_queue, max_pending):
+    """
+    Producer: membaca dan mem-filter file GDF secara paralel di beberapa
+    proses, lalu memasukkan hasilnya ke queue secara berurutan selesai.
+
+    Jumlah file yang sedang diproses dibatasi oleh max_pending, dan
+    out_queue bersifat bounded, sehingga memori tetap terkendali bila
+    inferensi lebih lambat dari preprocessing.
+    """
+    # 'spawn' agar proses anak tidak mewarisi state TensorFlow dari parent
+    ctx = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx) as executor:
+            remaining = list(files)
+            pending = {}
+            while remaining or pending:
+                while remaining and len(pending) < max_pending:
+                    path = remaining.pop(0)
+                    future = executor.submit(load_and_preprocess_file, path, keep_full_window)
+                    pending[future] = path
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        X, y = future.result()
+                        out_queue.put((path, X, y, None))
+                    except Exception as e:
+                        out_queue.put((path, None, None, e))
+    except Exception as e:
+        # Pool rusak (cth: worker di-kill karena OOM): laporkan ke consumer
+        out_queue.put((None, None, None, e))
+    finally:
+        # Selalu akhiri stream agar consumer tidak menunggu selamanya
+        out_queue.put(_END_OF_STREAM)
+
+def write_predictions(output_path, columns):
+    """
+    Menulis hasil prediksi ke file Parquet (format kolumnar).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow dibutuhkan untuk menulis file Parquet. "
+                          "Jalankan: pip install pyarrow")
+
+    table = pa.table(columns)
+    pq.write_table(table, output_path)
+
+def score_recordings(files, model, output_path, batch_size=256, n_workers=None,
+                     n_crops=config.TTA_N_CROPS, aggregation=config.TTA_AGGREGATION,
+                     queue_size=4):
+    """
+    Menilai (scoring) semua epoch dari banyak rekaman GDF secara pipelined:
+    I/O + filtering berjalan di proses producer, sementara thread utama
+    menjalankan inferensi berbatch besar pada file yang sudah siap.
+
+    Return: dict ringkasan (jumlah epoch, waktu, throughput, akurasi per file)
+    """
+    CLASS_LABELS = {v: k for k, v in config.EVENT_ID.items()}
+    if n_workers is None:
+        n_workers = max(1, (os.cpu_count() or 2) - 1)
+
+    file_queue = queue.Queue(maxsize=queue_size)
+    producer = threading.Thread(
+        target=_produce,
+        args=(files, n_crops > 1, n_workers, file_queue, n_workers + queue_size),
+        daemon=True
+    )
+
+    columns = {name: [] for name in (
+        'file', 'epoch_index', 'true_index', 'predicted_index',
+        'predicted_label', 'confidence', 'file_accuracy')}
+    for label in CLASS_LABELS.values():
+        columns[f'prob_{label}'] = []
+
+    names = relative_names(files)
+    file_accuracy = {}
+    failed_files = []
+    total_epochs = 0
+    inference_time = 0.0
+    wait_time = 0.0
+
+    start = time.perf_counter()
+    producer.start()
+
+    while True:
+        wait_start = time.perf_counter()
+        item = file_queue.get()
+        wait_time += time.perf_counter() - wait_start
+        if item is _END_OF_STREAM:
+            break
+
+        path, X, y, error = item
+        if path is None:
+            # Error pada producer itu sendiri; file yang tersisa tidak diproses
+            print(f"  ✗ Producer berhenti karena error: {error!r}")
+            failed_files.append(('<producer>', repr(error)))
+            continue
+        name = names.get(path, path)
+        if error is not None:
+            print(f"  ✗ Gagal memproses {name}: {error}")
+            failed_files.append((name, repr(error)))
+            continue
+
+        infer_start = time.perf_counter()
+        probs = predict_tta(model, X, n_crops=n_crops, aggregation=aggregation,
+                            batch_size=batch_size)
+        inference_time += time.perf_counter() - infer_start
+
+        predicted = np.argmax(probs, axis=1)
+        labelled = y >= 0
+        # Akurasi hanya bisa dihitung jika file memiliki label kelas
+        accuracy = float(np.mean(predicted[labelled] == y[labelled])) if labelled.any() else None
+        file_accuracy[name] = accuracy
+
+        n = len(predicted)
+        total_epochs += n
+        columns['file'].extend([name] * n)
+        columns['epoch_index'].extend(range(n))
+        columns['true_index'].extend(y.tolist())
+        columns['predicted_index'].extend(predicted.tolist())
+        columns['predicted_label'].extend(CLASS_LABELS[i] for i in predicted)
+        columns['confidence'].extend(probs[np.arange(n), predicted].tolist())
+        columns['file_accuracy'].extend([accuracy] * n)
+        for index, label in CLASS_LABELS.items():
+            columns[f'prob_{label}'].extend(probs[:, index].tolist())
+
+        acc_text = f"{accuracy * 100:.2f}%" if accuracy is not None else "n/a (tanpa label)"
+        print(f"  ✓ {name}: {n} epoch, akurasi {acc_text}")
+
+    producer.join()
+    total_time = time.perf_counter() - start
+
+    write_predictions(output_path, columns)
+
+    return {
+        'n_files': len(file_accuracy),
+        'n_epochs': total_epochs,
+        'total_time_s': total_time,
+        'inference_time_s': inference_time,
+        'wait_time_s': wait_time,
+        'epochs_per_sec': total_epochs / total_time if total_time > 0 else 0.0,
+        'inference_epochs_per_sec': total_epochs / inference_time if inference_time > 0 else 0.0,
+        'file_accuracy': file_accuracy,
+        'failed_files': failed_files,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scoring offline semua epoch dari satu atau banyak rekaman GDF.")
+    parser.add_argument('inputs', nargs='+',
+                        help="File .gdf atau direktori berisi file .gdf")
+    parser.add_argument('-o', '--output', default='predictions.parquet',
+                        help="Path file output Parquet")
+    parser.add_argument('--model', default=os.path.join(config.MODEL_OUTPUT_DIR, config.MODEL_FILENAME),
+                        help="Path model Keras .h5")
+    parser.add_argument('--batch-size', type=int, default=256,
+                        help="Jumlah epoch per forward pass")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Jumlah proses preprocessing (default: jumlah core - 1)")
+    parser.add_argument('--n-crops', type=int, default=config.TTA_N_CROPS,
+                        help="Jumlah crop TTA per epoch (1 = tanpa TTA)")
+    parser.add_argument('--aggregation', choices=AGGREGATIONS, default=config.TTA_AGGREGATION)
+    args = parser.parse_args()
+
+    files = find_gdf_files(args.inputs)
+    if not files:
+        print("Error: Tidak ada file .gdf yang ditemukan.")
+        return
+
+    print(f"Memuat model dari: {args.model}")
+    model = tf.keras.models.load_model(args.model)
+
+    print(f"Memproses {len(files)} file...")
+    summary = score_recordings(files, model, args.output,
+                               batch_size=args.batch_size, n_workers=args.workers,
+                               n_crops=args.n_crops, aggregation=args.aggregation)
+
+    print("\n--- RINGKASAN BATCH SCORING ---")
+    print(f"File diproses       : {summary['n_files']}")
+    print(f"Total epoch         : {summary['n_epochs']}")
+    print(f"Waktu total         : {summary['total_time_s']:.2f} s")
+    print(f"Waktu inferensi     : {summary['inference_time_s']:.2f} s")
+    print(f"Menunggu preprocess : {summary['wait_time_s']:.2f} s")
+    print(f"Throughput          : {summary['epochs_per_sec']:.1f} epoch/s "
+          f"(inferensi saja: {summary['inference_epochs_per_sec']:.1f} epoch/s)")
+    print(f"Hasil disimpan di   : {args.output}")
+    if summary['failed_files']:
+        print(f"Gagal               : {len(summary['failed_files'])} "
+              f"({', '.join(name for name, _ in summary['failed_files'])})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import Input, Dense, Activation
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.constraints import max_norm
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+import config
+
+# Metode kalibrasi yang didukung:
+# - 'logistic': regresi logistik multinomial (closed-form-like, via scikit-learn)
+# - 'dense'   : fine-tuning layer 'dense' Keras di atas fitur yang di-cache
+CALIBRATION_METHODS = ('logistic', 'dense')
+
+def build_feature_extractor(model):
+    """
+    Membuat sub-model dari input sampai layer 'flatten'.
+    Semua blok konvolusi EEGNet dipakai apa adanya (frozen).
+    """
+    return Model(inputs=model.input, outputs=model.get_layer('flatten').output)
+
+def extract_features(feature_extractor, X, batch_size=256):
+    """
+    Menjalankan epoch kalibrasi SEKALI melalui blok EEGNet yang frozen.
+    Fitur hasilnya di-cache dan dipakai ulang selama fitting head.
+    Return: array berbentuk (n_epochs, n_features)
+    """
+    return feature_extractor.predict(X, batch_size=batch_size, verbose=0)
+
+def fit_head(features, y, base_model, method=config.CALIBRATION_METHOD):
+    """
+    Melatih hanya classifier head di atas fitur yang sudah di-cache.
+
+    y berisi label integer (0..NB_CLASSES-1).
+    Return: (kernel, bias) dengan bentuk yang sama seperti layer 'dense'.
+    """
+    base_kernel, base_bias = base_model.get_layer('dense').get_weights()
+    nb_classes = base_bias.shape[0]
+
+    if method == 'logistic':
+        if len(np.unique(y)) != nb_classes:
+            raise ValueError(f"Metode 'logistic' membutuhkan contoh dari semua "
+                             f"{nb_classes} kelas dalam data kalibrasi.")
+        clf = LogisticRegression(C=config.CALIBRATION_C, max_iter=1000)
+        clf.fit(features, y)
+        # softmax(W^T x + b) identik dengan regresi logistik multinomial
+        return clf.coef_.T.astype(np.float32), clf.intercept_.astype(np.float32)
+
+    elif method == 'dense':
+        # Head kecil dengan struktur yang sama seperti layer 'dense' EEGNet,
+        # diinisialisasi dari weights model dasar
+        inputs = Input(shape=(features.shape[1],))
+        dense = Dense(nb_classes, name='dense',
+                      kernel_constraint=max_norm(0.25))(inputs)
+        outputs = Activation('softmax')(dense)
+        head = Model(inputs=inputs, outputs=outputs)
+        head.get_layer('dense').set_weights([base_kernel, base_bias])
+
+        head.compile(loss='sparse_categorical_crossentropy',
+                     optimizer=Adam(learning_rate=config.CALIBRATION_LEARNING_RATE))
+        head.fit(features, y, batch_size=len(features),
+                 epochs=config.CALIBRATION_EPOCHS, verbose=0)
+        return head.get_layer('dense').get_weights()
+
+    else:
+        raise ValueError(f"method '{method}' tidak dikenali. "
+                         f"Gunakan salah satu dari {CALIBRATION_METHODS}.")
+
+def build_user_model(base_model, kernel, bias):
+    """
+    Membuat varian model per-user: salinan model dasar dengan
+    weights layer 'dense' diganti hasil kalibrasi.
+    """
+    user_model = tf.keras.models.clone_model(base_model)
+    user_model.set_weights(base_model.get_weights())
+    user_model.get_layer('dense').set_weights([kernel, bias])
+    return user_model
+
+def _head_accuracy(features, y, kernel, bias):
+    logits = features @ kernel + bias
+    return float(np.mean(np.argmax(logits, axis=1) == y))
+
+def calibrate(base_model, X, y, method=config.CALIBRATION_METHOD,
+              validation_split=0.2, feature_extractor=None):
+    """
+    Kalibrasi cepat untuk user baru.
+
+    1. Fitur diekstrak sekali dari blok EEGNet yang frozen (sampai 'flatten').
+    2. Jika data cukup (dan split bertingkat per kelas memungkinkan), head
+       dilatih pada sebagian data untuk mengukur akurasi validasi.
+    3. Head final dilatih pada SEMUA data kalibrasi.
+
+    X berbentuk (n_epochs, CHANS, SAMPLES, 1), y berisi label integer.
+    Return: (user_model, report)
+    """
+    y = np.asarray(y)
+    start = time.perf_counter()
+
+    if feature_extractor is None:
+        feature_extractor = build_feature_extractor(base_model)
+    features = extract_features(feature_extractor, X)
+    feature_time = time.perf_counter() - start
+
+    validation_accuracy = None
+    if validation_split and len(y) >= 10:
+        try:
+            f_train, f_val, y_train, y_val = train_test_split(
+                features, y, test_size=validation_split,
+                random_state=config.RANDOM_SEED, stratify=y)
+        except ValueError:
+            # Terlalu sedikit contoh per kelas untuk split bertingkat; split
+            # acak bisa menghilangkan satu kelas dari data train, jadi
+            # estimasi validasi dilewati (validation_accuracy = None)
+            f_train = None
+        if f_train is not None:
+            kernel, bias = fit_head(f_train, y_train, base_model, method)
+            validation_accuracy = _head_accuracy(f_val, y_val, kernel, bias)
+
+    kernel, bias = fit_head(features, y, base_model, method)
+    user_model = build_user_model(base_model, kernel, bias)
+    total_time = time.perf_counter() - start
+
+    report = {
+        'method': method,
+        'n_epochs': int(len(y)),
+        'feature_ms': feature_time * 1000,
+        'calibration_ms': total_time * 1000,
+        'train_accuracy': _head_accuracy(features, y, kernel, bias),
+        'validation_accuracy': validation_accuracy,
+    }
+    return user_model, report
+
+if __name__ == '__main__':
+    # Membandingkan kalibrasi head dengan training ulang penuh dari nol
+    # pada data kalibrasi yang sama.
+    # Jalankan dari folder 'src/': python calibration.py [--subject N]
+    import argparse
+    from model import EEGNet
+    from data_processing import load_cached_data
+
+    # Subjek uji harus subjek yang TIDAK dipakai untuk melatih model dasar
+    # (train.py memuat semua sesi A0<id>T/E dari SUBJECTS_TO_PROCESS), agar
+    # feature extractor belum pernah melihat data uji.
+    unseen = [s for s in range(1, 10) if s not in config.SUBJECTS_TO_PROCESS]
+    parser = argparse.ArgumentParser(
+        description="Kalibrasi head vs training ulang penuh pada subjek baru.")
+    parser.add_argument('--subject', type=int, default=unseen[0] if unseen else None,
+                        help="Subjek yang tidak dipakai untuk melatih model dasar")
+    args = parser.parse_args()
+    if args.subject is None or args.subject in config.SUBJECTS_TO_PROCESS:
+        parser.error("--subject harus subjek di luar config.SUBJECTS_TO_PROCESS "
+                     "(data training model dasar).")
+
+    model_path = os.path.join(config.MODEL_OUTPUT_DIR, config.MODEL_FILENAME)
+    print(f"Memuat model dasar dari: {model_path}")
+    base_model = tf.keras.models.load_model(model_path)
+
+    subject = args.subject
+    X, y_one_hot = load_cached_data(config.DATA_DIR, subject)
+    if X is None:
+        raise SystemExit("Gagal memuat data.")
+    y = np.argmax(y_one_hot, axis=1)
+
+    # Sedikit epoch untuk kalibrasi (cth: 12 per kelas), sisanya untuk uji
+    X_cal, X_test, y_cal, y_test = train_test_split(
+        X, y, train_size=12 * config.NB_CLASSES,
+        random_state=config.RANDOM_SEED, stratify=y)
+
+    print("\n--- HASIL KALIBRASI vs TRAINING ULANG PENUH ---")
+    print(f"Subjek uji: {subject} (tidak dipakai untuk melatih model dasar, "
+          f"subjek training: {config.SUBJECTS_TO_PROCESS}); "
+          f"{len(y_cal)} epoch kalibrasi, {len(y_test)} epoch uji")
+    for method in CALIBRATION_METHODS:
+        user_model, report = calibrate(base_model, X_cal, y_cal, method=method)
+        acc = np.mean(np.argmax(user_model.predict(X_test, verbose=0), axis=1) == y_test)
+        print(f"Kalibrasi '{method}': {report['calibration_ms'] / 1000:.2f} s, "
+              f"akurasi uji {acc * 100:.2f}%")
+
+    start = time.perf_counter()
+    full_model = EEGNet(nb_classes=config.NB_CLASSES, Chans=config.CHANS,
+                        Samples=config.SAMPLES, **config.MODEL_PARAMS)
+    full_model.compile(loss='sparse_categorical_crossentropy',
+                       optimizer=Adam(learning_rate=config.LEARNING_RATE),
+                       metrics=['accuracy'])
+    full_model.fit(X_cal, y_cal, batch_size=config.BATCH_SIZE,
+                   epochs=config.EPOCHS, verbose=0)
+    full_time = time.perf_counter() - start
+    acc = np.mean(np.argmax(full_model.predict(X_test, verbose=0), axis=1) == y_test)
+    print(f"Training ulang penuh ({config.EPOCHS} epoch): {full_time:.2f} s, "
+          f"akurasi uji {acc * 100:.2f}%")
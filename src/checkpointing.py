@@ -0,0 +1,274 @@
+import os
+import glob
+import time
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback, EarlyStopping
+
+import config
+
+# Nama file checkpoint: 'ckpt-0001.pkl', ... dan 'best.pkl'
+CHECKPOINT_PATTERN = 'ckpt-{epoch:04d}.pkl'
+BEST_CHECKPOINT = 'best.pkl'
+
+def _optimizer_variables(optimizer):
+    """
+    Mengambil daftar variabel optimizer.
+    (optimizer lama: method `variables()`, optimizer baru TF>=2.11: property)
+    """
+    variables = optimizer.variables
+    return variables() if callable(variables) else variables
+
+class EpochSeededSequence(tf.keras.utils.Sequence):
+    """
+    Data training yang urutan shuffle-nya hanya bergantung pada
+    (seed, epoch). Saat training dilanjutkan dari epoch N, urutan batch
+    sama persis dengan run yang tidak terputus, tanpa perlu menyimpan
+    state RNG apa pun (cukup nomor epoch di checkpoint).
+
+    Catatan: mask dropout Keras memakai seed op TensorFlow yang tidak
+    bisa disimpan, jadi dropout TIDAK diulang secara bitwise.
+    Gunakan bersama `model.fit(..., shuffle=False)`.
+    """
+
+    def __init__(self, X, y, batch_size, seed=config.RANDOM_SEED, initial_epoch=0):
+        super().__init__()
+        self.X = X
+        self.y = y
+        self.batch_size = batch_size
+        self.seed = seed
+        self.epoch = initial_epoch
+        self._shuffle()
+
+    def _shuffle(self):
+        self.order = np.random.default_rng([self.seed, self.epoch]).permutation(len(self.X))
+
+    def __len__(self):
+        return int(np.ceil(len(self.X) / self.batch_size))
+
+    def __getitem__(self, index):
+        batch = self.order[index * self.batch_size:(index + 1) * self.batch_size]
+        return self.X[batch], self.y[batch]
+
+    def on_epoch_end(self):
+        self.epoch += 1
+        self._shuffle()
+
+def _write_atomic(path, state):
+    """
+    Menulis state ke file sementara lalu me-rename-nya, sehingga file
+    checkpoint tidak pernah setengah-tertulis jika proses di-kill.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def load_latest_checkpoint(checkpoint_dir=config.CHECKPOINT_DIR):
+    """
+    Memuat checkpoint terakhir (epoch tertinggi) dari checkpoint_dir.
+    Return: dict state, atau None jika belum ada checkpoint.
+    """
+    paths = sorted(glob.glob(os.path.join(checkpoint_dir, 'ckpt-*.pkl')))
+    if not paths:
+        return None
+    print(f"Memuat checkpoint: {paths[-1]}")
+    return _read(paths[-1])
+
+def load_best_checkpoint(checkpoint_dir=config.CHECKPOINT_DIR):
+    """
+    Memuat checkpoint terbaik (berdasarkan metrik 'monitor').
+    Return: dict state, atau None jika belum ada.
+    """
+    path = os.path.join(checkpoint_dir, BEST_CHECKPOINT)
+    if not os.path.exists(path):
+        return None
+    return _read(path)
+
+def resume_best(state, checkpoint_dir=config.CHECKPOINT_DIR, mode='max'):
+    """
+    Nilai metrik terbaik yang harus dipakai saat melanjutkan training.
+
+    Checkpoint periodik terakhir bisa lebih tua dari best.pkl (cth: best
+    ditulis di epoch 7, checkpoint periodik terakhir di epoch 5). Tanpa ini,
+    epoch yang diulang bisa menimpa best.pkl dengan model yang lebih buruk.
+    """
+    if state is None:
+        return None
+    best_state = load_best_checkpoint(checkpoint_dir)
+    if best_state is None:
+        return state['best']
+    pick = max if mode == 'max' else min
+    return pick(state['best'], best_state['best'])
+
+def clear_checkpoints(checkpoint_dir=config.CHECKPOINT_DIR):
+    """
+    Menghapus semua checkpoint lama (dipakai saat training dimulai dari awal).
+    """
+    for path in glob.glob(os.path.join(checkpoint_dir, '*.pkl')):
+        os.remove(path)
+
+def restore_training_state(model, state):
+    """
+    Mengembalikan weights dan state optimizer dari sebuah checkpoint.
+    Model harus sudah di-compile.
+
+    Return: epoch berikutnya yang harus dijalankan (untuk `initial_epoch`).
+    """
+    model.set_weights(state['weights'])
+
+    optimizer = model.optimizer
+    # Variabel optimizer dibuat secara lazy; bangun dulu sebelum diisi
+    if hasattr(optimizer, 'build'):
+        optimizer.build(model.trainable_variables)
+    elif hasattr(optimizer, '_create_all_weights'):
+        optimizer._create_all_weights(model.trainable_variables)
+
+    variables = _optimizer_variables(optimizer)
+    if len(variables) == len(state['optimizer']):
+        for variable, value in zip(variables, state['optimizer']):
+            variable.assign(value)
+    else:
+        print("Peringatan: Struktur optimizer berbeda, state optimizer tidak dipulihkan.")
+
+    return state['epoch'] + 1
+
+class ResumableEarlyStopping(EarlyStopping):
+    """
+    EarlyStopping yang state-nya (wait, best, best_weights) bisa
+    disimpan ke checkpoint dan dipulihkan saat training dilanjutkan.
+    EarlyStopping bawaan Keras me-reset state ini di on_train_begin.
+    """
+
+    def __init__(self, initial_state=None, **kwargs):
+        super().__init__(**kwargs)
+        self.initial_state = initial_state
+
+    def on_train_begin(self, logs=None):
+        super().on_train_begin(logs)
+        if self.initial_state:
+            for key, value in self.initial_state.items():
+                setattr(self, key, value)
+
+    def get_state(self):
+        return {
+            'wait': self.wait,
+            'best': self.best,
+            'best_weights': self.best_weights,
+            'best_epoch': getattr(self, 'best_epoch', 0),
+        }
+
+class AsyncCheckpoint(Callback):
+    """
+    Callback checkpoint asinkron.
+
+    Di thread training hanya dilakukan snapshot (salinan numpy dari
+    weights dan variabel optimizer); serialisasi dan penulisan
+    ke disk dilakukan oleh satu thread background. Menyimpan N checkpoint
+    terakhir ditambah checkpoint terbaik (best.pkl).
+
+    Waktu stall per epoch (waktu yang dihabiskan di thread training)
+    dicatat di `logs['checkpoint_stall_ms']`.
+    """
+
+    def __init__(self, checkpoint_dir=config.CHECKPOINT_DIR, monitor='val_accuracy',
+                 mode='max', save_freq=config.CHECKPOINT_EVERY,
+                 keep_last=config.CHECKPOINT_KEEP_LAST, early_stopping=None,
+                 initial_best=None, verbose=1):
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.monitor = monitor
+        self.mode = mode
+        self.save_freq = save_freq
+        self.keep_last = keep_last
+        self.early_stopping = early_stopping
+        self.verbose = verbose
+
+        if initial_best is not None:
+            self.best = initial_best
+        else:
+            self.best = -np.inf if mode == 'max' else np.inf
+
+        self.stall_times = []
+        self._executor = None
+        self._pending = []
+
+    def _is_improvement(self, value):
+        if value is None:
+            return False
+        return value > self.best if self.mode == 'max' else value < self.best
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs if logs is not None else {}
+        start = time.perf_counter()
+
+        value = logs.get(self.monitor)
+        is_best = self._is_improvement(value)
+        if is_best:
+            self.best = value
+        is_periodic = (epoch + 1) % self.save_freq == 0
+        # Checkpoint terakhir juga disimpan saat training akan berhenti
+        is_last = self.model.stop_training or epoch + 1 >= self.params.get('epochs', 0)
+
+        if is_best or is_periodic or is_last:
+            # Snapshot: get_weights() dan .numpy() sudah mengembalikan salinan
+            state = {
+                'epoch': epoch,
+                'weights': self.model.get_weights(),
+                'optimizer': [v.numpy() for v in _optimizer_variables(self.model.optimizer)],
+                'monitor': self.monitor,
+                'best': self.best,
+                'logs': dict(logs),
+                'finished': bool(self.model.stop_training),
+                'early_stopping': self.early_stopping.get_state() if self.early_stopping else None,
+            }
+            # Hapus future yang sudah selesai, laporkan error penulisan jika ada
+            for future in [f for f in self._pending if f.done()]:
+                self._pending.remove(future)
+                future.result()
+            self._pending.append(
+                self._executor.submit(self._write, state, is_best, is_periodic or is_last))
+
+        stall = time.perf_counter() - start
+        self.stall_times.append(stall)
+        logs['checkpoint_stall_ms'] = stall * 1000
+
+    def _write(self, state, is_best, is_periodic):
+        if is_periodic:
+            path = os.path.join(self.checkpoint_dir, CHECKPOINT_PATTERN.format(epoch=state['epoch'] + 1))
+            _write_atomic(path, state)
+            self._prune()
+        if is_best:
+            _write_atomic(os.path.join(self.checkpoint_dir, BEST_CHECKPOINT), state)
+            if self.verbose:
+                print(f"\nEpoch {state['epoch'] + 1}: {self.monitor} membaik ke "
+                      f"{state['best']:.5f}, checkpoint terbaik disimpan.")
+
+    def _prune(self):
+        """Hanya mempertahankan `keep_last` checkpoint periodik terakhir."""
+        paths = sorted(glob.glob(os.path.join(self.checkpoint_dir, 'ckpt-*.pkl')))
+        for path in paths[:-self.keep_last]:
+            os.remove(path)
+
+    def on_train_end(self, logs=None):
+        # Tunggu semua penulisan selesai sebelum training dianggap selesai
+        self._executor.shutdown(wait=True)
+        for future in self._pending:
+            future.result()
+        self._pending = []
+
+        if self.stall_times and self.verbose:
+            stalls_ms = np.array(self.stall_times) * 1000
+            print(f"Checkpoint stall per epoch: rata-rata {stalls_ms.mean():.2f} ms, "
+                  f"maks {stalls_ms.max():.2f} ms")
@@ -62,10 +62,17 @@ else:
     # 6. TRUNCATE data agar sama dengan data training (1000 sampel)
     # Model dilatih dengan data yang dipotong sesuai config.SAMPLES
     # Ini meniru baris `X = epochs_data[:, :, :config.SAMPLES]` di data_processing.py
-    sample_epoch_v_truncated = sample_epoch_v[:, :config.SAMPLES] # Bentuk (22, 1000)
+    # Jika TTA aktif (config.TTA_N_CROPS > 1), kirim epoch penuh (1251 sampel)
+    # dan biarkan server membuat K crop bergeser.
+    # Jika DECIMATION_FACTOR > 1, epoch penuh juga dikirim agar server
+    # mendesimasi dulu lalu memotong, sama persis seperti saat training.
+    if config.TTA_N_CROPS > 1 or config.DECIMATION_FACTOR > 1:
+        sample_epoch_v_truncated = sample_epoch_v # Bentuk (22, 1251)
+    else:
+        sample_epoch_v_truncated = sample_epoch_v[:, :config.SAMPLES_RAW] # Bentuk (22, 1000)
     
     print(f"Bentuk epoch asli: {sample_epoch_v.shape}")
-    print(f"Bentuk epoch terpotong (truncated): {sample_epoch_v_truncated.shape}")
+    print(f"Bentuk epoch yang dikirim: {sample_epoch_v_truncated.shape}")
     
     # 7. Konversi data yang SUDAH DIPOTONG ke format list JSON
     sample_epoch_list = sample_epoch_v_truncated.tolist()
@@ -74,6 +81,9 @@ else:
     payload = {
         "data": sample_epoch_list
     }
+    if config.TTA_N_CROPS > 1:
+        payload["n_crops"] = config.TTA_N_CROPS
+        payload["aggregation"] = config.TTA_AGGREGATION
     
     import sys
 
@@ -91,7 +101,11 @@ else:
     
     try:
         # Kirim data sebagai JSON
-        response = requests.post(predict_endpoint, json=payload, timeout=30) # 30 detik timeout
+        # Deadline dikirim ke server agar request yang sudah basi
+        # (melewati timeout klien) tidak lagi dihitung di server
+        headers = {"X-Priority": "realtime", "X-Deadline-Ms": "30000"}
+        response = requests.post(predict_endpoint, json=payload, headers=headers,
+                                 timeout=30) # 30 detik timeout
         
         # Cek status
         response.raise_for_status() # Akan error jika status 4xx or 5xx
@@ -106,7 +120,7 @@ else:
     except requests.exceptions.ConnectionError as errc:
         print(f"\n--- ❌ Error Koneksi: {errc} ---")
         print(">>> PASTIKAN SERVER API ANDA SUDAH BERJALAN! <<<")
-        print(">>> (Jalankan 'uvicorn src.api:app --reload' di terminal lain) <<<")
+        print(">>> (Jalankan 'cd src && uvicorn api:app --reload' di terminal lain) <<<")
     except requests.exceptions.Timeout as errt:
         print(f"\n--- ❌ Timeout Error: {errt} ---")
     except requests.exceptions.RequestException as err:
@@ -3,10 +3,20 @@
 # --- Konfigurasi Data ---
 # Path ke direktori data mentah .gdf
 DATA_DIR = '../data/' 
+# Cache data yang sudah diproses (.npz) agar training tidak perlu
+# memuat dan mem-filter ulang file .gdf setiap kali dijalankan
+CACHE_DIR = '../data/cache/'
 # Subjek yang akan diproses (nantinya bisa di-loop)
 SUBJECTS_TO_PROCESS = [1] 
 # Frekuensi sampling data (di notebook Anda adalah 250 Hz)
 SAMPLING_RATE = 250
+# Faktor desimasi temporal. Sinyal sudah di-band-pass 8-30 Hz, sehingga
+# sebagian besar sampel pada 250 Hz redundan. Faktor 2 -> 125 Hz
+# (mendekati 128 Hz pada paper EEGNet asli). 1 = tanpa desimasi.
+# Syarat: salah satu dari SUPPORTED_DECIMATION_FACTORS (1, 2 atau 4)
+DECIMATION_FACTOR = 1
+# Frekuensi sampling efektif yang dilihat model
+EFFECTIVE_SAMPLING_RATE = SAMPLING_RATE / DECIMATION_FACTOR
 
 # --- Parameter Preprocessing ---
 # Filter frekuensi
@@ -19,6 +29,8 @@ TMAX = 4.0   # Waktu akhir epoch (detik)
 EVENT_ID = {'769': 0, '770': 1, '771': 2, '772': 3}
 # Jumlah kelas
 NB_CLASSES = len(EVENT_ID)
+# Sesi evaluasi (A0xE.gdf) hanya memiliki event cue '783' tanpa label kelas
+UNKNOWN_EVENT_ID = {'783': 7}
 
 # --- Parameter Arsitektur Model ---
 # Ini harus sesuai dengan data Anda setelah diproses
@@ -27,17 +39,59 @@ CHANS = 22
 # SAMPLES = 1000 (dari notebook, Anda mengambil 1000 sampel pertama dari epoch)
 # Perhitungan: (TMAX - TMIN) * SAMPLING_RATE = 5.0 * 250 = 1251 sampel
 # Notebook Anda memotongnya menjadi 1000, jadi kita ikuti:
-SAMPLES = 1000
-
-# Parameter EEGNet (sesuai notebook Anda)
-MODEL_PARAMS = {
-    'F1': 8,
-    'D': 2,
-    'F2': 16,
-    'kernLength': 125,  # Sesuai notebook (SAMPLING_RATE / 2)
-    'dropoutRate': 0.5,
-    'dropoutType': 'Dropout'
-}
+SAMPLES_RAW = 1000
+# Panjang epoch penuh sebelum dipotong: int((TMAX - TMIN) * SAMPLING_RATE) + 1
+EPOCH_SAMPLES_RAW = 1251
+# Jumlah sampel setelah desimasi (inilah yang masuk ke model)
+SAMPLES = SAMPLES_RAW // DECIMATION_FACTOR
+EPOCH_SAMPLES = -(-EPOCH_SAMPLES_RAW // DECIMATION_FACTOR)
+
+# Faktor desimasi yang didukung: pool2 = 8 / faktor harus bulat (agar jumlah
+# fitur di layer 'flatten' tetap) dan Nyquist baru harus > H_FREQ
+SUPPORTED_DECIMATION_FACTORS = tuple(
+    f for f in (1, 2, 4, 8) if SAMPLING_RATE / f / 2 > H_FREQ)  # -> (1, 2, 4)
+
+def check_decimation_factor(decimation):
+    """
+    Raise ValueError jika faktor desimasi tidak ada di
+    SUPPORTED_DECIMATION_FACTORS. Dipakai oleh model_params_for dan
+    data_processing.decimate agar keduanya menolak faktor yang sama.
+    """
+    if decimation not in SUPPORTED_DECIMATION_FACTORS:
+        raise ValueError(f"Faktor desimasi {decimation} tidak didukung. Gunakan salah satu "
+                         f"dari {SUPPORTED_DECIMATION_FACTORS} (pool2 = 8 / faktor harus bulat "
+                         f"dan SAMPLING_RATE / faktor / 2 harus > H_FREQ {H_FREQ} Hz).")
+
+def model_params_for(decimation):
+    """
+    Parameter EEGNet untuk faktor desimasi tertentu.
+    Panjang kernel temporal dan pooling blok 2 diskalakan 1/decimation
+    agar rentang waktu (dalam detik) yang dilihat tiap filter tetap sama
+    dan jumlah fitur di layer 'flatten' tidak berubah.
+    Hanya faktor di SUPPORTED_DECIMATION_FACTORS yang diterima.
+    """
+    check_decimation_factor(decimation)
+    return {
+        'F1': 8,
+        'D': 2,
+        'F2': 16,
+        'kernLength': max(1, round(125 / decimation)),  # Sesuai notebook (SAMPLING_RATE / 2)
+        'sepKernLength': max(1, round(16 / decimation)),
+        'pool1': 4,
+        'pool2': 8 // decimation,
+        'dropoutRate': 0.5,
+        'dropoutType': 'Dropout'
+    }
+
+# Parameter EEGNet (sesuai notebook Anda, diskalakan dengan DECIMATION_FACTOR)
+MODEL_PARAMS = model_params_for(DECIMATION_FACTOR)
+
+# --- Parameter Test-Time Augmentation (TTA) ---
+# Jumlah crop bergeser (K) yang diambil dari epoch penuh (1251 sampel).
+# K = 1 berarti tanpa TTA (hanya crop pertama, sama seperti training).
+TTA_N_CROPS = 1
+# Cara menggabungkan probabilitas antar crop: 'mean' atau 'geomean'
+TTA_AGGREGATION = 'mean'
 
 # --- Parameter Training ---
 LEARNING_RATE = 0.001
@@ -45,7 +99,55 @@ BATCH_SIZE = 16
 EPOCHS = 300
 RANDOM_SEED = 42
 
+# --- Parameter Training Terdistribusi (distributed_train.py) ---
+# Checkpoint terpisah dari training single-process; untuk beberapa host
+# direktori ini harus berada di storage bersama (NFS, dll.)
+DISTRIBUTED_CHECKPOINT_DIR = '../models/checkpoints_distributed/'
+# Port pertama untuk worker lokal (worker i memakai port BASE + i)
+DISTRIBUTED_BASE_PORT = 12345
+
+# --- Parameter Kalibrasi Per-User ---
+# Hanya classifier head ('dense') yang dilatih ulang di atas fitur 'flatten'
+# Metode: 'logistic' (regresi logistik, scikit-learn) atau 'dense' (Keras)
+CALIBRATION_METHOD = 'logistic'
+# Regularisasi (inverse) untuk metode 'logistic'
+CALIBRATION_C = 1.0
+# Parameter untuk metode 'dense'
+CALIBRATION_EPOCHS = 200
+CALIBRATION_LEARNING_RATE = 0.01
+
+# --- Parameter Checkpoint ---
+# Checkpoint (weights + optimizer + epoch + RNG) ditulis secara asinkron
+CHECKPOINT_DIR = '../models/checkpoints/'
+# Simpan checkpoint setiap N epoch (checkpoint terbaik selalu disimpan)
+CHECKPOINT_EVERY = 5
+# Jumlah checkpoint periodik terakhir yang dipertahankan
+CHECKPOINT_KEEP_LAST = 3
+
+# --- Parameter Admission Control (/predict) ---
+# Jumlah inferensi maksimal yang berjalan bersamaan
+ADMISSION_MAX_CONCURRENCY = 4
+# Panjang antrian maksimal per jalur prioritas
+ADMISSION_MAX_QUEUE = {'realtime': 16, 'bulk': 64}
+# Deadline default (ms) jika klien tidak mengirim header X-Deadline-Ms
+ADMISSION_DEFAULT_DEADLINE_MS = {'realtime': 1000, 'bulk': 30000}
+
+# --- Parameter Profiling (endpoint admin) ---
+# Token admin dibaca dari environment variable EEG_ADMIN_TOKEN;
+# jika tidak diset, endpoint /admin/* dinonaktifkan
+ADMIN_TOKEN_ENV = 'EEG_ADMIN_TOKEN'
+# Durasi maksimal satu sesi profiling (detik)
+PROFILE_MAX_DURATION_S = 60
+# Interval sampling profiler CPU (detik)
+PROFILE_SAMPLE_INTERVAL_S = 0.005
+# Jumlah request terakhir yang timing-nya disimpan
+SLOW_REQUEST_BUFFER_SIZE = 1000
+# Jumlah request paling lambat yang dikembalikan
+SLOW_REQUEST_TOP_K = 20
+
 # --- Path Output ---
 # Tempat menyimpan model yang sudah dilatih
 MODEL_OUTPUT_DIR = '../models/'
 MODEL_FILENAME = 'eegnet_model.h5'
+# Tempat menyimpan varian model hasil kalibrasi per-user
+USER_MODEL_DIR = '../models/users/'
@@ -2,17 +2,40 @@ import os
 import glob
 import numpy as np
 import mne
+from scipy.signal import resample_poly
 from tensorflow.keras.utils import to_categorical
 
 # Impor konfigurasi dari file config.py
 import config
 
-def load_and_preprocess_data(data_dir, subject_id):
+def decimate(X, factor=config.DECIMATION_FACTOR):
+    """
+    Desimasi temporal pada sumbu terakhir dengan filter anti-aliasing.
+
+    Band-pass di preprocessing masih meloloskan sebagian sinyal di pita
+    transisi di atas H_FREQ (sampai ~H_FREQ + 7.5 Hz), jadi mengambil
+    setiap sampel ke-`factor` saja bisa menyebabkan aliasing. Karena itu
+    dipakai resample_poly (low-pass FIR pada Nyquist baru, lalu downsample);
+    padding 'line' mengurangi artefak di tepi epoch.
+    """
+    config.check_decimation_factor(factor)
+    if factor == 1:
+        return X
+    return np.ascontiguousarray(resample_poly(X, 1, factor, axis=-1, padtype='line'))
+
+def load_and_preprocess_data(data_dir, subject_id, keep_full_window=False, decimation=None):
     """
     Memuat data GDF untuk satu subjek, menerapkan filter, 
     membuat epoch, dan memformatnya untuk training.
     
     Menggunakan parameter dari file config.py
+    
+    Jika keep_full_window=True, epoch TIDAK dipotong ke config.SAMPLES
+    sehingga seluruh 1251 sampel tersedia untuk test-time augmentation
+    (lihat tta.py). Bentuk X menjadi (n_epochs, CHANS, EPOCH_SAMPLES, 1).
+    
+    decimation menimpa config.DECIMATION_FACTOR (cth: untuk membandingkan
+    beberapa faktor, lihat decimation_report.py).
     """
     
     # 1. Cari file data untuk subjek
@@ -26,6 +49,62 @@ def load_and_preprocess_data(data_dir, subject_id):
     
     print(f"Memuat file: {gdf_files}")
     
+    X, y = _preprocess_gdf_files(gdf_files, keep_full_window=keep_full_window,
+                                 decimation=decimation)
+    
+    # d. Konversi label ke one-hot encoding
+    y_one_hot = to_categorical(y, num_classes=config.NB_CLASSES)
+    
+    print(f"Data preprocessing selesai untuk subjek {subject_id}.")
+    print(f"Bentuk X: {X.shape}")
+    print(f"Bentuk y: {y_one_hot.shape}")
+    
+    return X, y_one_hot
+
+def load_cached_data(data_dir, subject_id, cache_dir=config.CACHE_DIR):
+    """
+    Sama seperti load_and_preprocess_data, tetapi hasilnya disimpan ke
+    file .npz di cache_dir. Pemanggilan berikutnya (cth: saat training
+    dilanjutkan) langsung memuat cache tanpa membaca ulang file .gdf.
+    """
+    cache_path = os.path.join(cache_dir, f'subject_{subject_id}_{config.SAMPLES}.npz')
+    
+    if os.path.exists(cache_path):
+        print(f"Memuat data dari cache: {cache_path}")
+        with np.load(cache_path) as cached:
+            return cached['X'], cached['y']
+    
+    X, y = load_and_preprocess_data(data_dir, subject_id)
+    if X is None:
+        return None, None
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(cache_path, X=X, y=y)
+    print(f"Data disimpan ke cache: {cache_path}")
+    return X, y
+
+def load_and_preprocess_file(file_path, keep_full_window=False):
+    """
+    Memuat dan memproses SATU file GDF (cth: 'A01E.gdf') dengan pipeline
+    yang sama seperti load_and_preprocess_data.
+    
+    Berbeda dengan load_and_preprocess_data, label dikembalikan sebagai
+    integer (bukan one-hot). File sesi evaluasi (A0xE.gdf) tidak memuat
+    label kelas, hanya event cue '783'; untuk file seperti ini semua
+    label bernilai -1 (tidak diketahui).
+    
+    Return: (X, y) dengan X berbentuk (n_epochs, CHANS, n_samples, 1)
+    """
+    return _preprocess_gdf_files([file_path], keep_full_window=keep_full_window,
+                                 allow_unlabelled=True)
+
+def _preprocess_gdf_files(gdf_files, keep_full_window=False, allow_unlabelled=False,
+                          decimation=None):
+    """
+    Pipeline preprocessing bersama: load, filter, epoching dan format.
+    Return: (X, y) dengan y berisi label integer 0..NB_CLASSES-1 (atau -1).
+    """
+    
     # 2. Load data mentah menggunakan MNE
     # Kita gabungkan semua file gdf untuk subjek ini (jika ada T dan E)
     raw_files = [mne.io.read_raw_gdf(f, preload=True) for f in gdf_files]
@@ -43,14 +122,19 @@ def load_and_preprocess_data(data_dir, subject_id):
                fir_design='firwin', skip_by_annotation='edge')
     
     # 6. Ekstraksi Events
-    events, _ = mne.events_from_annotations(raw, event_id=config.EVENT_ID)
+    # Sesi evaluasi hanya memiliki cue '783' (kelas tidak diketahui)
+    event_id = config.EVENT_ID
+    descriptions = set(raw.annotations.description)
+    if allow_unlabelled and not descriptions.intersection(config.EVENT_ID):
+        event_id = config.UNKNOWN_EVENT_ID
+    events, _ = mne.events_from_annotations(raw, event_id=event_id)
     
     # 7. Buat Epochs
     # Pilih hanya channel EEG
     picks = mne.pick_types(raw.info, meg=False, eeg=True, stim=False, eog=False, 
                            exclude='bads')
                            
-    epochs = mne.Epochs(raw, events, event_id=config.EVENT_ID, 
+    epochs = mne.Epochs(raw, events, event_id=event_id, 
                         tmin=config.TMIN, tmax=config.TMAX, 
                         proj=True, picks=picks, 
                         baseline=None, preload=True)
@@ -68,28 +152,30 @@ def load_and_preprocess_data(data_dir, subject_id):
     # Event_id MNE `{'769': 0, '770': 1, '771': 2, '772': 3}` 
     # MNE akan me-map '769' (di anotasi) ke event ID 0 (di `epochs.events`)
     # Jadi 'y' sudah berisi 0, 1, 2, 3.
+    if event_id is config.UNKNOWN_EVENT_ID:
+        y = np.full(len(y), -1)
     
     # 10. Memformat data untuk Keras/TensorFlow
     
     # a. Konversi data (dari V ke uV, sesuai notebook)
     X *= 1e6
     
+    # a2. Desimasi temporal (250 Hz -> 250 / DECIMATION_FACTOR Hz)
+    if decimation is None:
+        decimation = config.DECIMATION_FACTOR
+    X = decimate(X, decimation)
+    
     # b. Potong sampel (sesuai notebook, dari 1251 menjadi 1000)
-    X = X[:, :, :config.SAMPLES]
+    #    Untuk TTA kita biarkan jendela penuh; crop dibuat saat inferensi.
+    if not keep_full_window:
+        X = X[:, :, :config.SAMPLES_RAW // decimation]
     
     # c. Reshape data: (n_epochs, n_channels, n_samples) 
     #    -> (n_epochs, n_channels, n_samples, 1)
     # Ini adalah format 'channels_first' yang diharapkan EEGNet
-    X = X.reshape(X.shape[0], config.CHANS, config.SAMPLES, 1)
-    
-    # d. Konversi label ke one-hot encoding
-    y_one_hot = to_categorical(y, num_classes=config.NB_CLASSES)
+    X = X.reshape(X.shape[0], config.CHANS, X.shape[2], 1)
     
-    print(f"Data preprocessing selesai untuk subjek {subject_id}.")
-    print(f"Bentuk X: {X.shape}")
-    print(f"Bentuk y: {y_one_hot.shape}")
-    
-    return X, y_one_hot
+    return X, y
 
 if __name__ == '__main__':
     # Bagian ini untuk testing cepat
@@ -0,0 +1,118 @@
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.optimizers import Adam
+from sklearn.model_selection import train_test_split
+
+import config
+from model import EEGNet
+from train import set_seeds
+
+def count_flops(model):
+    """
+    Menghitung jumlah FLOPs satu forward pass (batch size 1) dengan
+    profiler TensorFlow pada graph yang sudah di-freeze.
+    """
+    from tensorflow.python.framework.convert_to_constants import (
+        convert_variables_to_constants_v2_as_graph)
+
+    spec = tf.TensorSpec([1] + list(model.input_shape[1:]), model.input.dtype)
+    concrete = tf.function(lambda x: model(x, training=False)).get_concrete_function(spec)
+    frozen_func, _ = convert_variables_to_constants_v2_as_graph(concrete)
+
+    options = tf.compat.v1.profiler.ProfileOptionBuilder.float_operation()
+    options['output'] = 'none'
+    info = tf.compat.v1.profiler.profile(graph=frozen_func.graph,
+                                         run_meta=tf.compat.v1.RunMetadata(),
+                                         cmd='op', options=options)
+    return info.total_float_ops
+
+def measure_latency(model, repeats=100):
+    """
+    Latensi rata-rata (ms) inferensi satu epoch dengan predict_on_batch.
+    """
+    sample = np.random.randn(1, *model.input_shape[1:]).astype(np.float32)
+    model.predict_on_batch(sample)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict_on_batch(sample)
+    return (time.perf_counter() - start) / repeats * 1000
+
+def build_model(decimation):
+    samples = config.SAMPLES_RAW // decimation
+    model = EEGNet(nb_classes=config.NB_CLASSES, Chans=config.CHANS,
+                   Samples=samples, **config.model_params_for(decimation))
+    model.compile(loss='categorical_crossentropy',
+                  optimizer=Adam(learning_rate=config.LEARNING_RATE),
+                  metrics=['accuracy'])
+    return model
+
+def run_report(factors, epochs, train=True):
+    """
+    Untuk setiap faktor desimasi: FLOPs, latensi inferensi dan (opsional)
+    waktu training serta akurasi validasi pada subjek pertama di config.
+
+    Data dimuat sekali pada 250 Hz (tanpa desimasi, jendela penuh), lalu
+    didesimasi di memori dengan langkah yang sama seperti
+    load_and_preprocess_data: decimate() dulu, lalu potong ke Samples model.
+    """
+    if train:
+        from data_processing import load_and_preprocess_data, decimate
+        # Muat data 250 Hz penuh, tanpa bergantung pada DECIMATION_FACTOR aktif
+        X, y = load_and_preprocess_data(config.DATA_DIR, config.SUBJECTS_TO_PROCESS[0],
+                                        keep_full_window=True, decimation=1)
+        if X is None:
+            raise SystemExit("Gagal memuat data.")
+        X_train, X_val, y_train, y_val = train_test_split(
+            X, y, test_size=0.2, random_state=config.RANDOM_SEED, stratify=y)
+
+    results = []
+    for factor in factors:
+        set_seeds()
+        model = build_model(factor)
+        row = {
+            'factor': factor,
+            'sampling_rate': config.SAMPLING_RATE / factor,
+            'params': model.count_params(),
+            'flops': count_flops(model),
+            'latency_ms': measure_latency(model),
+        }
+
+        if train:
+            # Sama seperti pipeline: desimasi (sumbu waktu) lalu potong ke Samples model
+            samples = model.input_shape[2]
+            Xt = decimate(X_train[..., 0], factor)[:, :, :samples, np.newaxis]
+            Xv = decimate(X_val[..., 0], factor)[:, :, :samples, np.newaxis]
+            start = time.perf_counter()
+            model.fit(Xt, y_train, batch_size=config.BATCH_SIZE, epochs=epochs,
+                      validation_data=(Xv, y_val), verbose=0)
+            row['train_time_s'] = time.perf_counter() - start
+            _, row['val_accuracy'] = model.evaluate(Xv, y_val, verbose=0)
+
+        results.append(row)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Laporan FLOPs, latensi, waktu training dan akurasi per faktor desimasi.")
+    parser.add_argument('--factors', type=int, nargs='+',
+                        default=list(config.SUPPORTED_DECIMATION_FACTORS),
+                        choices=config.SUPPORTED_DECIMATION_FACTORS)
+    parser.add_argument('--epochs', type=int, default=50,
+                        help="Jumlah epoch training per faktor")
+    parser.add_argument('--no-train', action='store_true',
+                        help="Hanya FLOPs dan latensi (tanpa data)")
+    args = parser.parse_args()
+
+    results = run_report(args.factors, args.epochs, train=not args.no_train)
+
+    print("\n--- LAPORAN DESIMASI ---")
+    print(f"{'Faktor':>6} | {'Hz':>6} | {'Params':>7} | {'MFLOPs':>7} | {'Latensi (ms)':>12} | "
+          f"{'Training (s)':>12} | {'Akurasi val':>11}")
+    for row in results:
+        train_time = f"{row['train_time_s']:.1f}" if 'train_time_s' in row else '-'
+        val_acc = f"{row['val_accuracy'] * 100:.2f}%" if 'val_accuracy' in row else '-'
+        print(f"{row['factor']:>6} | {row['sampling_rate']:>6.1f} | {row['params']:>7} | "
+              f"{row['flops'] / 1e6:>7.2f} | {row['latency_ms']:>12.2f} | "
+              f"{train_time:>12} | {val_acc:>11}")
@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import Callback
+from sklearn.model_selection import train_test_split
+
+import config
+from model import EEGNet
+from train import set_seeds
+from data_processing import load_cached_data
+from checkpointing import (AsyncCheckpoint, ResumableEarlyStopping,
+                           load_latest_checkpoint, load_best_checkpoint,
+                           restore_training_state, clear_checkpoints,
+                           resume_best)
+
+class EpochTimer(Callback):
+    """
+    Mencatat durasi setiap epoch (detik) untuk laporan scaling.
+    """
+
+    def on_train_begin(self, logs=None):
+        self.epoch_times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_times.append(time.perf_counter() - self._start)
+
+def make_dataset_fn(X, y, per_worker_batch, training):
+    """
+    Membuat dataset_fn untuk strategy.distribute_datasets_from_function.
+
+    - training=True: setiap worker hanya mengambil shard miliknya dari
+      dataset yang sudah di-cache di memori (batch tidak lengkap dibuang).
+    - training=False: setiap worker mengevaluasi SELURUH data validasi
+      tanpa membuang sisa batch, sehingga metrik validasi (setelah di-reduce
+      antar worker) dihitung pada set yang sama seperti train.py.
+    """
+    def dataset_fn(input_context):
+        dataset = tf.data.Dataset.from_tensor_slices((X, y))
+        if training:
+            dataset = dataset.shard(input_context.num_input_pipelines,
+                                    input_context.input_pipeline_id)
+            dataset = dataset.shuffle(len(X), seed=config.RANDOM_SEED,
+                                      reshuffle_each_iteration=True)
+        dataset = dataset.batch(per_worker_batch, drop_remainder=training).repeat()
+        return dataset.prefetch(tf.data.AUTOTUNE)
+    return dataset_fn
+
+def run_worker(epochs=config.EPOCHS, resume=True,
+               checkpoint_dir=config.DISTRIBUTED_CHECKPOINT_DIR, metrics_out=None):
+    """
+    Dijalankan di SETIAP proses worker. Cluster dibaca dari environment
+    variable TF_CONFIG (diatur oleh launcher atau manual di setiap host).
+
+    - Gradien disinkronkan dengan MultiWorkerMirroredStrategy (all-reduce).
+    - Batch per worker = config.BATCH_SIZE, batch global = BATCH_SIZE * n_workers.
+    - Hanya worker 0 (chief) yang menulis checkpoint dan model .h5;
+      semua worker memuat checkpoint yang sama saat resume
+      (untuk beberapa host, CHECKPOINT_DIR harus berada di storage bersama).
+    - Metrik validasi di-reduce antar worker, sehingga keputusan
+      early stopping identik di semua worker.
+    """
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    resolver = strategy.cluster_resolver
+    worker_index = resolver.task_id if resolver.task_id is not None else 0
+    num_workers = strategy.num_replicas_in_sync
+    is_chief = worker_index == 0
+    print(f"Worker {worker_index}/{num_workers} siap (chief={is_chief}).")
+
+    set_seeds()
+
+    # 1. Muat data dari cache (.npz), split sama seperti train.py
+    X, y = load_cached_data(config.DATA_DIR, config.SUBJECTS_TO_PROCESS[0])
+    if X is None:
+        print("Gagal memuat data. Proses training dibatalkan.")
+        return
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=0.2, random_state=config.RANDOM_SEED, stratify=y)
+
+    per_worker_batch = config.BATCH_SIZE
+    # Shard training terkecil harus berisi minimal satu batch penuh
+    if len(X_train) // num_workers < per_worker_batch:
+        raise ValueError(f"Data training ({len(X_train)} epoch) terlalu sedikit untuk "
+                         f"{num_workers} worker dengan batch {per_worker_batch}. "
+                         f"Kurangi jumlah worker atau BATCH_SIZE.")
+    # Jumlah step harus sama di semua worker agar all-reduce tidak macet
+    steps_per_epoch = len(X_train) // num_workers // per_worker_batch
+    # Validasi tidak di-shard: satu pass penuh atas X_val (batch terakhir boleh parsial)
+    validation_steps = int(np.ceil(len(X_val) / per_worker_batch))
+
+    # distribute_datasets_from_function didukung Keras 2 dan Keras 3
+    # (DatasetCreator hanya ada di Keras 2 / TF < 2.16)
+    train_data = strategy.distribute_datasets_from_function(
+        make_dataset_fn(X_train, y_train, per_worker_batch, training=True))
+    val_data = strategy.distribute_datasets_from_function(
+        make_dataset_fn(X_val, y_val, per_worker_batch, training=False))
+
+    # 2. Buat dan kompilasi model di dalam scope strategy
+    with strategy.scope():
+        model = EEGNet(
+            nb_classes=config.NB_CLASSES,
+            Chans=config.CHANS,
+            Samples=config.SAMPLES,
+            **config.MODEL_PARAMS
+        )
+        model.compile(
+            loss='categorical_crossentropy',
+            optimizer=Adam(learning_rate=config.LEARNING_RATE),
+            metrics=['accuracy']
+        )
+
+        # 3. Lanjutkan dari checkpoint (semua worker membaca checkpoint yang sama)
+        initial_epoch = 0
+        state = load_latest_checkpoint(checkpoint_dir) if resume else None
+        if state is not None:
+            initial_epoch = restore_training_state(model, state)
+            print(f"Worker {worker_index}: melanjutkan dari epoch {initial_epoch + 1}")
+
+    if not resume and is_chief:
+        clear_checkpoints(checkpoint_dir)
+
+    # 4. Callbacks
+    early_stop = ResumableEarlyStopping(
+        initial_state=state['early_stopping'] if state else None,
+        monitor='val_loss',
+        patience=50,
+        verbose=1 if is_chief else 0,
+        mode='min',
+        restore_best_weights=True
+    )
+    timer = EpochTimer()
+    callbacks_list = [early_stop, timer]
+    if is_chief:
+        callbacks_list.append(AsyncCheckpoint(
+            checkpoint_dir=checkpoint_dir,
+            monitor='val_accuracy',
+            mode='max',
+            early_stopping=early_stop,
+            initial_best=resume_best(state, checkpoint_dir, mode='max')
+        ))
+
+    # 5. Latih Model
+    if state is not None and state['finished']:
+        print("Checkpoint menandakan training sudah selesai (early stopping).")
+    else:
+        model.fit(
+            train_data,
+            epochs=epochs,
+            initial_epoch=initial_epoch,
+            steps_per_epoch=steps_per_epoch,
+            validation_data=val_data,
+            validation_steps=validation_steps,
+            callbacks=callbacks_list,
+            verbose=1 if is_chief else 0
+        )
+
+    if not is_chief:
+        return
+
+    # 6. Chief: ekspor model terbaik ke .h5 (model biasa, di luar strategy)
+    best_state = load_best_checkpoint(checkpoint_dir)
+    if best_state is not None:
+        export_model = EEGNet(nb_classes=config.NB_CLASSES, Chans=config.CHANS,
+                              Samples=config.SAMPLES, **config.MODEL_PARAMS)
+        export_model.set_weights(best_state['weights'])
+        model_save_path = os.path.join(config.MODEL_OUTPUT_DIR, config.MODEL_FILENAME)
+        os.makedirs(config.MODEL_OUTPUT_DIR, exist_ok=True)
+        export_model.save(model_save_path)
+        print(f"Model terbaik disimpan di {model_save_path}")
+    else:
+        print(f"Peringatan: best.pkl tidak ditemukan di {checkpoint_dir}, model .h5 tidak diekspor.")
+
+    if metrics_out:
+        with open(metrics_out, 'w') as f:
+            json.dump({'num_workers': num_workers,
+                       'global_batch_size': per_worker_batch * num_workers,
+                       'epoch_times': timer.epoch_times}, f)
+
+def make_tf_config(hosts, index):
+    return json.dumps({
+        'cluster': {'worker': list(hosts)},
+        'task': {'type': 'worker', 'index': index}
+    })
+
+def launch_local(num_workers, worker_args, base_port=config.DISTRIBUTED_BASE_PORT):
+    """
+    Menjalankan `num_workers` proses worker di mesin ini (untuk testing
+    dan untuk mesin multi-socket). Core CPU dibagi rata antar worker.
+    Jika salah satu worker keluar dengan error, worker lainnya dihentikan.
+    Return: True jika semua worker selesai tanpa error.
+    """
+    # Pastikan cache data sudah ada agar worker tidak memproses .gdf bersamaan
+    X, _ = load_cached_data(config.DATA_DIR, config.SUBJECTS_TO_PROCESS[0])
+    if X is None:
+        print("Gagal memuat data. Worker tidak dijalankan.")
+        return False
+
+    hosts = [f'localhost:{base_port + i}' for i in range(num_workers)]
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ,
+                   TF_CONFIG=make_tf_config(hosts, index),
+                   EEG_WORKER_THREADS=str(threads))
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker'] + worker_args, env=env))
+
+    # Pantau semua worker; jika satu gagal, worker lain akan macet di
+    # all-reduce, jadi hentikan semuanya
+    try:
+        while any(p.poll() is None for p in processes):
+            if any(p.returncode not in (None, 0) for p in processes):
+                break
+            time.sleep(0.5)
+    finally:
+        for p in processes:
+            if p.poll() is None:
+                p.terminate()
+        for p in processes:
+            try:
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+                p.wait()
+
+    failed = [index for index, p in enumerate(processes) if p.returncode != 0]
+    if failed:
+        print(f"Worker {failed} gagal, semua worker dihentikan.")
+    return not failed
+
+def scaling_report(worker_counts, epochs):
+    """
+    Menjalankan training singkat untuk setiap jumlah worker dan
+    membandingkan rata-rata waktu per epoch (epoch pertama diabaikan
+    karena berisi warm-up/tracing).
+    """
+    rows = []
+    for num_workers in worker_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics_path = os.path.join(tmp, 'metrics.json')
+            ok = launch_local(num_workers, ['--epochs', str(epochs), '--no-resume',
+                                            '--checkpoint-dir', os.path.join(tmp, 'ckpt'),
+                                            '--metrics-out', metrics_path])
+            if not ok or not os.path.exists(metrics_path):
+                print(f"Run dengan {num_workers} worker gagal, dilewati.")
+                continue
+            with open(metrics_path) as f:
+                metrics = json.load(f)
+        times = metrics['epoch_times'][1:] or metrics['epoch_times']
+        rows.append((num_workers, metrics['global_batch_size'], float(np.mean(times))))
+
+    if not rows:
+        return
+    base_time = rows[0][2] * rows[0][0]
+    print("\n--- LAPORAN SCALING ---")
+    print(f"{'Worker':>6} | {'Batch global':>12} | {'Epoch (s)':>9} | {'Speedup':>7} | {'Efisiensi':>9}")
+    for num_workers, global_batch, epoch_time in rows:
+        speedup = rows[0][2] / epoch_time
+        efficiency = base_time / (epoch_time * num_workers)
+        print(f"{num_workers:>6} | {global_batch:>12} | {epoch_time:>9.2f} | "
+              f"{speedup:>6.2f}x | {efficiency * 100:>8.1f}%")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Training EEGNet data-parallel multi-proses / multi-host.")
+    parser.add_argument('--launch-local', type=int, metavar='N',
+                        help="Jalankan N worker di mesin ini")
+    parser.add_argument('--hosts', nargs='+', metavar='HOST:PORT',
+                        help="Daftar semua worker (sama di setiap host); dipakai bersama --index")
+    parser.add_argument('--index', type=int, help="Index worker ini di --hosts")
+    parser.add_argument('--scaling-report', type=int, nargs='+', metavar='N',
+                        help="Laporan waktu epoch untuk beberapa jumlah worker (cth: 1 2 4)")
+    parser.add_argument('--epochs', type=int, default=config.EPOCHS)
+    parser.add_argument('--no-resume', action='store_true')
+    parser.add_argument('--checkpoint-dir', default=config.DISTRIBUTED_CHECKPOINT_DIR)
+    parser.add_argument('--metrics-out', help="Path JSON untuk waktu per epoch (chief)")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    worker_args = ['--epochs', str(args.epochs), '--checkpoint-dir', args.checkpoint_dir]
+    if args.no_resume:
+        worker_args.append('--no-resume')
+
+    if args.scaling_report:
+        scaling_report(args.scaling_report, args.epochs)
+    elif args.launch_local:
+        ok = launch_local(args.launch_local, worker_args)
+        sys.exit(0 if ok else 1)
+    else:
+        if args.hosts:
+            if args.index is None:
+                parser.error("--hosts membutuhkan --index")
+            os.environ['TF_CONFIG'] = make_tf_config(args.hosts, args.index)
+        # Batasi thread TensorFlow jika beberapa worker berbagi satu mesin
+        threads = int(os.environ.get('EEG_WORKER_THREADS', 0))
+        if threads:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(2)
+        run_worker(epochs=args.epochs, resume=not args.no_resume,
+                   checkpoint_dir=args.checkpoint_dir, metrics_out=args.metrics_out)
@@ -7,7 +7,8 @@ from tensorflow.keras.constraints import max_norm
 
 def EEGNet(nb_classes, Chans=64, Samples=128, 
            dropoutRate=0.5, kernLength=64, F1=8, 
-           D=2, F2=16, norm_rate=0.25, dropoutType='Dropout'):
+           D=2, F2=16, norm_rate=0.25, dropoutType='Dropout',
+           sepKernLength=16, pool1=4, pool2=8):
     """
     Implementasi Keras Functional API dari EEGNet.
     
@@ -16,6 +17,9 @@ def EEGNet(nb_classes, Chans=64, Samples=128,
     
     Penting: Fungsi ini HANYA mengembalikan arsitektur model (belum di-compile).
     Proses kompilasi (menentukan optimizer, loss) akan dilakukan di 'train.py'.
+    
+    sepKernLength, pool1 dan pool2 mengikuti nilai notebook (16, 4, 8) untuk
+    250 Hz; untuk data yang didesimasi gunakan config.model_params_for().
     """
     
     # Pastikan kita menggunakan tipe Dropout yang valid
@@ -50,18 +54,18 @@ def EEGNet(nb_classes, Chans=64, Samples=128,
                              depthwise_constraint=max_norm(1.))(block1)
     block1 = BatchNormalization()(block1)
     block1 = Activation('elu')(block1)
-    block1 = AveragePooling2D((1, 4))(block1)
+    block1 = AveragePooling2D((1, pool1))(block1)
     block1 = dropoutLayer(dropoutRate)(block1)
 
     ##################################################################
     # Block 2: Separable Convolution
     # Menggabungkan feature map dan melakukan konvolusi temporal lagi
     ##################################################################
-    block2 = SeparableConv2D(F2, (1, 16),
+    block2 = SeparableConv2D(F2, (1, sepKernLength),
                              use_bias=False, padding='same')(block1)
     block2 = BatchNormalization()(block2)
     block2 = Activation('elu')(block2)
-    block2 = AveragePooling2D((1, 8))(block2)
+    block2 = AveragePooling2D((1, pool2))(block2)
     block2 = dropoutLayer(dropoutRate)(block2)
 
     ##################################################################
@@ -0,0 +1,168 @@
+import os
+import sys
+import math
+import time
+import shutil
+import zipfile
+import tempfile
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import config
+
+# Hanya boleh ada satu sesi profiling pada satu waktu
+_capture_lock = threading.Lock()
+
+class SamplingProfiler:
+    """
+    Profiler CPU berbasis sampling untuk proses Python ini.
+
+    Sebuah thread background mengambil stack semua thread lain
+    (sys._current_frames) setiap `interval` detik dan menghitungnya
+    dalam format 'folded stacks' (kompatibel dengan flamegraph.pl
+    dan speedscope). Tidak ada overhead sama sekali saat tidak aktif,
+    karena tidak ada hook yang dipasang pada interpreter.
+    """
+
+    def __init__(self, interval=config.PROFILE_SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.stacks = Counter()
+        self.n_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                # Folded stack: dari root ke leaf, dipisah ';'
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.n_samples += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+def capture_profile(duration_s, tf_trace=True):
+    """
+    Menjalankan profiling selama `duration_s` detik:
+    - profil CPU sampling (cpu.folded)
+    - trace op-level TensorFlow untuk semua inferensi di jendela ini (tf_trace/)
+
+    Return: path file .zip berisi hasil profiling (di direktori sementara;
+    pemanggil bertanggung jawab menghapusnya).
+    Raise ValueError jika duration_s bukan angka berhingga (cth: nan),
+    RuntimeError jika sesi profiling lain sedang berjalan.
+    """
+    if not math.isfinite(duration_s):
+        raise ValueError(f"duration_s harus berupa angka berhingga, diterima {duration_s}")
+    if not _capture_lock.acquire(blocking=False):
+        raise RuntimeError("Sesi profiling lain sedang berjalan.")
+
+    work_dir = None
+    try:
+        duration_s = min(max(duration_s, 0.1), config.PROFILE_MAX_DURATION_S)
+        work_dir = tempfile.mkdtemp(prefix='eeg_profile_')
+        trace_dir = os.path.join(work_dir, 'tf_trace')
+
+        if tf_trace:
+            import tensorflow as tf
+            tf.profiler.experimental.start(trace_dir)
+
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            time.sleep(duration_s)
+        finally:
+            profiler.stop()
+            if tf_trace:
+                tf.profiler.experimental.stop()
+
+        profiler.write_folded(os.path.join(work_dir, 'cpu.folded'))
+
+        # Kemas semua hasil menjadi satu file .zip yang bisa diunduh
+        zip_dir = tempfile.mkdtemp(prefix='eeg_profile_zip_')
+        zip_path = os.path.join(zip_dir, 'profile.zip')
+        try:
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for root, _, files in os.walk(work_dir):
+                    for name in files:
+                        full_path = os.path.join(root, name)
+                        zf.write(full_path, os.path.relpath(full_path, work_dir))
+        except Exception:
+            shutil.rmtree(zip_dir, ignore_errors=True)
+            raise
+        return zip_path
+    finally:
+        # Direktori kerja selalu dihapus, termasuk jika profiler gagal start
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        _capture_lock.release()
+
+class StageTimer:
+    """
+    Mencatat durasi setiap tahap (stage) dalam satu request, dalam ms.
+
+    Contoh:
+        timer = StageTimer()
+        with timer.stage('inference'):
+            ...
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        stage_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = (time.perf_counter() - stage_start) * 1000
+
+    def total_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+class SlowRequestLog:
+    """
+    Buffer bergulir (rolling) berisi N request terakhir beserta timing
+    per-stage; `slowest()` mengembalikan request paling lambat di antaranya.
+    """
+
+    def __init__(self, maxlen=config.SLOW_REQUEST_BUFFER_SIZE):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, total_ms, stages, **info):
+        entry = {
+            'timestamp': time.time(),
+            'total_ms': total_ms,
+            'stages_ms': dict(stages),
+        }
+        entry.update(info)
+        with self._lock:
+            self._records.append(entry)
+
+    def slowest(self, limit=config.SLOW_REQUEST_TOP_K):
+        with self._lock:
+            records = list(self._records)
+        return sorted(records, key=lambda r: r['total_ms'], reverse=True)[:limit]
@@ -1,14 +1,18 @@
 import os
+import argparse
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
 from sklearn.model_selection import train_test_split
 
 # --- Impor Modul Kustom Kita ---
 import config
 from model import EEGNet
-from data_processing import load_and_preprocess_data
+from data_processing import load_cached_data
+from checkpointing import (AsyncCheckpoint, ResumableEarlyStopping,
+                           load_latest_checkpoint, load_best_checkpoint,
+                           restore_training_state, clear_checkpoints,
+                           resume_best, EpochSeededSequence)
 
 def set_seeds(seed=config.RANDOM_SEED):
     """
@@ -19,9 +23,15 @@ def set_seeds(seed=config.RANDOM_SEED):
     np.random.seed(seed)
     print(f"Random seeds diatur ke: {seed}")
 
-def train_model():
+def train_model(resume=True):
     """
     Fungsi utama untuk melatih model.
+    
+    Jika resume=True dan ada checkpoint di config.CHECKPOINT_DIR,
+    training dilanjutkan dari epoch terakhir yang tersimpan
+    (weights, state optimizer, epoch dan state early stopping). Urutan
+    shuffle per epoch ditentukan oleh (seed, epoch), sehingga sama seperti
+    run tanpa interupsi; mask dropout tidak diulang secara bitwise.
     """
     print("Memulai proses training...")
     
@@ -31,7 +41,7 @@ def train_model():
     # 2. Muat dan Proses Data
     # Saat ini kita hanya melatih pada subjek pertama (sesuai config)
     print(f"Memuat data untuk subjek: {config.SUBJECTS_TO_PROCESS[0]}...")
-    X, y = load_and_preprocess_data(config.DATA_DIR, config.SUBJECTS_TO_PROCESS[0])
+    X, y = load_cached_data(config.DATA_DIR, config.SUBJECTS_TO_PROCESS[0])
     
     if X is None or y is None:
         print("Gagal memuat data. Proses training dibatalkan.")
@@ -77,50 +87,79 @@ def train_model():
     model_save_path = os.path.join(config.MODEL_OUTPUT_DIR, config.MODEL_FILENAME)
     print(f"Model akan disimpan di: {model_save_path}")
 
-    # 7. Siapkan Callbacks
-    # ModelCheckpoint menyimpan model terbaik (berdasarkan val_accuracy)
-    checkpoint = ModelCheckpoint(
-        filepath=model_save_path,
-        monitor='val_accuracy',
-        verbose=1,
-        save_best_only=True,
-        mode='max'
-    )
+    # 7. Lanjutkan dari checkpoint (jika ada)
+    initial_epoch = 0
+    state = load_latest_checkpoint(config.CHECKPOINT_DIR) if resume else None
+    if not resume:
+        clear_checkpoints(config.CHECKPOINT_DIR)
+    if state is not None:
+        initial_epoch = restore_training_state(model, state)
+        print(f"Melanjutkan training dari epoch {initial_epoch + 1}")
     
+    # 8. Siapkan Callbacks
     # EarlyStopping menghentikan training jika tidak ada peningkatan
-    early_stop = EarlyStopping(
+    early_stop = ResumableEarlyStopping(
+        initial_state=state['early_stopping'] if state else None,
         monitor='val_loss',
         patience=50, # Jumlah epoch tanpa peningkatan sebelum berhenti
         verbose=1,
         mode='min',
         restore_best_weights=True # Kembalikan weights terbaik saat berhenti
     )
-
-    callbacks_list = [checkpoint, early_stop]
     
-    # 8. Latih Model
-    print("=== MEMULAI TRAINING ===")
-    history = model.fit(
-        X_train, y_train,
-        batch_size=config.BATCH_SIZE,
-        epochs=config.EPOCHS,
-        validation_data=(X_val, y_val),
-        callbacks=callbacks_list,
-        verbose=1
+    # AsyncCheckpoint menyimpan checkpoint terbaik (berdasarkan val_accuracy)
+    # dan checkpoint periodik di thread background.
+    # Diletakkan SETELAH early_stop agar keputusan berhenti ikut tersimpan.
+    checkpoint = AsyncCheckpoint(
+        checkpoint_dir=config.CHECKPOINT_DIR,
+        monitor='val_accuracy',
+        mode='max',
+        early_stopping=early_stop,
+        initial_best=resume_best(state, config.CHECKPOINT_DIR, mode='max')
     )
+
+    callbacks_list = [early_stop, checkpoint]
     
-    print("=== TRAINING SELESAI ===")
+    # 9. Latih Model
+    if state is not None and state['finished']:
+        print("Checkpoint menandakan training sudah selesai (early stopping).")
+        if state['early_stopping'] and state['early_stopping']['best_weights'] is not None:
+            model.set_weights(state['early_stopping']['best_weights'])
+    else:
+        print("=== MEMULAI TRAINING ===")
+        # Shuffle ditentukan oleh (seed, epoch) agar bisa dilanjutkan tepat
+        train_data = EpochSeededSequence(X_train, y_train, config.BATCH_SIZE,
+                                         initial_epoch=initial_epoch)
+        history = model.fit(
+            train_data,
+            shuffle=False,
+            epochs=config.EPOCHS,
+            initial_epoch=initial_epoch,
+            validation_data=(X_val, y_val),
+            callbacks=callbacks_list,
+            verbose=1
+        )
+        print("=== TRAINING SELESAI ===")
     
-    # 9. (Opsional) Evaluasi model terbaik pada data validasi
+    # 10. (Opsional) Evaluasi model terbaik pada data validasi
     # Karena restore_best_weights=True, model sudah memiliki weights terbaik
     val_loss, val_acc = model.evaluate(X_val, y_val, verbose=0)
     print(f"\nHasil akhir pada data validasi (dari weights terbaik):")
     print(f"Validation Loss: {val_loss:.4f}")
     print(f"Validation Accuracy: {val_acc * 100:.2f}%")
     
-    # Catatan: File .h5 di `model_save_path` berisi model terbaik
-    # berkat `save_best_only=True` pada ModelCheckpoint.
+    # 11. Ekspor model terbaik (berdasarkan val_accuracy) ke .h5
+    # File .h5 hanya ditulis sekali di akhir, bukan setiap ada peningkatan.
+    best_state = load_best_checkpoint(config.CHECKPOINT_DIR)
+    if best_state is not None:
+        model.set_weights(best_state['weights'])
+    model.save(model_save_path)
     print(f"Model terbaik disimpan di {model_save_path}")
 
 if __name__ == '__main__':
-    train_model()
+    parser = argparse.ArgumentParser(description="Melatih model EEGNet.")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="Abaikan checkpoint yang ada dan mulai training dari awal")
+    args = parser.parse_args()
+    
+    train_model(resume=not args.no_resume)
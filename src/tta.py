@@ -0,0 +1,168 @@
+import os
+import time
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+import config
+
+# Cara agregasi probabilitas yang didukung
+AGGREGATIONS = ('mean', 'geomean')
+
+def crop_step(total_samples, n_crops, crop_samples=config.SAMPLES):
+    """
+    Menghitung jarak (dalam sampel) antar crop sehingga K crop
+    tersebar merata dari awal sampai akhir epoch penuh.
+
+    Crop pertama selalu dimulai di offset 0 (sama dengan data training).
+    """
+    if n_crops < 1:
+        raise ValueError(f"n_crops harus >= 1, diterima {n_crops}")
+    if total_samples < crop_samples:
+        raise ValueError(f"Epoch hanya memiliki {total_samples} sampel, "
+                         f"butuh minimal {crop_samples} sampel untuk satu crop.")
+    if n_crops == 1:
+        return 0
+
+    step = (total_samples - crop_samples) // (n_crops - 1)
+    if step < 1:
+        raise ValueError(f"Tidak bisa membuat {n_crops} crop berbeda dari "
+                         f"{total_samples} sampel (maksimal "
+                         f"{total_samples - crop_samples + 1} crop).")
+    return step
+
+def make_crops(X, n_crops, crop_samples=config.SAMPLES):
+    """
+    Membuat K crop bergeser dari epoch penuh sebagai *strided view*
+    (tanpa menyalin data).
+
+    Input X boleh berbentuk (CHANS, T), (N, CHANS, T) atau (N, CHANS, T, 1).
+    Output berbentuk (N, K, CHANS, crop_samples, 1) dan bersifat read-only,
+    karena semua crop berbagi memori yang sama dengan X.
+    """
+    X = np.asarray(X)
+    # Normalisasi bentuk ke (N, CHANS, T, 1) - semuanya masih view
+    if X.ndim == 2:
+        X = X[np.newaxis, :, :, np.newaxis]
+    elif X.ndim == 3:
+        X = X[:, :, :, np.newaxis]
+    elif X.ndim != 4:
+        raise ValueError(f"Bentuk X tidak didukung: {X.shape}")
+
+    n_epochs, n_chans, total_samples, _ = X.shape
+    step = crop_step(total_samples, n_crops, crop_samples)
+
+    s_epoch, s_chan, s_sample, s_last = X.strides
+    # Sumbu crop (K) hanyalah stride 'step' sampel di sepanjang sumbu waktu
+    return as_strided(
+        X,
+        shape=(n_epochs, n_crops, n_chans, crop_samples, 1),
+        strides=(s_epoch, step * s_sample, s_chan, s_sample, s_last),
+        writeable=False
+    )
+
+def aggregate_probabilities(probs, aggregation='mean'):
+    """
+    Menggabungkan probabilitas dari K crop.
+    probs berbentuk (N, K, NB_CLASSES) -> hasil (N, NB_CLASSES).
+    """
+    if aggregation == 'mean':
+        return probs.mean(axis=1)
+    elif aggregation == 'geomean':
+        # Rata-rata di ruang log, lalu dinormalisasi ulang agar total = 1
+        log_mean = np.log(np.clip(probs, 1e-12, 1.0)).mean(axis=1)
+        agg = np.exp(log_mean)
+        return agg / agg.sum(axis=1, keepdims=True)
+    else:
+        raise ValueError(f"aggregation '{aggregation}' tidak dikenali. "
+                         f"Gunakan salah satu dari {AGGREGATIONS}.")
+
+def predict_tta(model, X, n_crops=config.TTA_N_CROPS,
+                aggregation=config.TTA_AGGREGATION, batch_size=None):
+    """
+    Menjalankan test-time augmentation: semua K crop dari semua epoch
+    diprediksi dalam SATU forward pass berbatch, lalu probabilitasnya
+    digabungkan per epoch.
+
+    batch_size (opsional) membatasi jumlah epoch per forward pass
+    untuk dataset besar, agar memori tetap terkendali.
+
+    Return: array probabilitas berbentuk (N, NB_CLASSES).
+    """
+    crops = make_crops(X, n_crops)
+    n_epochs = crops.shape[0]
+    crop_shape = crops.shape[2:]  # (CHANS, SAMPLES, 1)
+
+    if batch_size is None:
+        batch_size = n_epochs
+
+    outputs = []
+    for start in range(0, n_epochs, batch_size):
+        chunk = crops[start:start + batch_size]
+        # Reshape ke (n * K, CHANS, SAMPLES, 1). Di sinilah satu-satunya
+        # salinan dibuat, tepat sebelum data diserahkan ke TensorFlow.
+        batch = chunk.reshape((-1,) + crop_shape)
+        probs = np.asarray(model.predict_on_batch(batch))
+        outputs.append(probs.reshape(chunk.shape[0], n_crops, -1))
+
+    probs = np.concatenate(outputs, axis=0)
+    return aggregate_probabilities(probs, aggregation)
+
+def benchmark_tta(model, X_full, k_values=(1, 2, 4, 8, 16), repeats=20):
+    """
+    Mengukur latensi satu epoch untuk setiap nilai K:
+    - 'batched_ms'   : semua crop dalam satu predict_on_batch
+    - 'sequential_ms': K kali model.predict, satu crop per panggilan
+
+    Return: dict {K: {'batched_ms': ..., 'sequential_ms': ...}}
+    """
+    sample = X_full[:1]
+    results = {}
+
+    for k in k_values:
+        # Warm-up agar tracing/graph building tidak ikut terukur
+        predict_tta(model, sample, n_crops=k)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            predict_tta(model, sample, n_crops=k)
+        batched_ms = (time.perf_counter() - start) / repeats * 1000
+
+        crops = make_crops(sample, k)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for i in range(k):
+                model.predict(crops[:, i], verbose=0)
+        sequential_ms = (time.perf_counter() - start) / repeats * 1000
+
+        results[k] = {'batched_ms': batched_ms, 'sequential_ms': sequential_ms}
+
+    return results
+
+if __name__ == '__main__':
+    # Laporan akurasi dan latensi TTA untuk setiap K
+    # Jalankan dari folder 'src/': python tta.py
+    import tensorflow as tf
+    from data_processing import load_and_preprocess_data
+
+    model_path = os.path.join(config.MODEL_OUTPUT_DIR, config.MODEL_FILENAME)
+    print(f"Memuat model dari: {model_path}")
+    model = tf.keras.models.load_model(model_path)
+
+    X_full, y = load_and_preprocess_data(config.DATA_DIR, config.SUBJECTS_TO_PROCESS[0],
+                                         keep_full_window=True)
+    if X_full is None:
+        raise SystemExit("Gagal memuat data.")
+    y_true = np.argmax(y, axis=1)
+
+    k_values = (1, 2, 4, 8, 16)
+    latencies = benchmark_tta(model, X_full, k_values)
+
+    print("\n--- HASIL TTA ---")
+    print(f"{'K':>4} | {'Akurasi':>8} | {'Batched (ms)':>13} | {'Sekuensial (ms)':>16}")
+    for k in k_values:
+        for aggregation in AGGREGATIONS:
+            probs = predict_tta(model, X_full, n_crops=k, aggregation=aggregation,
+                                batch_size=64)
+            acc = np.mean(np.argmax(probs, axis=1) == y_true)
+            print(f"{k:>4} | {acc * 100:>7.2f}% | {latencies[k]['batched_ms']:>13.2f} | "
+                  f"{latencies[k]['sequential_ms']:>16.2f}  ({aggregation})")